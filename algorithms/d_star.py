@@ -1,97 +1,128 @@
 import cv2
-import heapq
+import math
 import sys
 import time
 
 sys.path.append('./ai_robotics_final_project')
 
-from utils.points import drawInitialPoints, heuristic
+from algorithms.grid_search import searchPath
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.deadline import feasible, isExpired, no_path, optimal, timeout
+from utils.points import drawInitialPoints, pathCost
+
+# Heuristic weights of the anytime searches, from fast to optimal; each
+# search bounds its path cost by its weight times the optimal cost
+anytime_heuristic_weights = (3, 2, 1.5, 1.25, 1)
 
 def executeDStar(
-  map: list,
+  map: LayeredMap,
+  grid: OccupancyGrid,
   start: cv2.typing.Point,
   goal: cv2.typing.Point,
-  verbose: bool = False
-) -> list:
+  verbose: bool = False,
+  planner: str = "4",
+  robot_radius: float = 0,
+  clearance_weight: float = 0,
+  deadline: float = None,
+  anytime: bool = False
+) -> tuple:
   """
-  Implement the D* algorithm to find the shortest path in the given map.
+  Implement the D* algorithm to find the shortest path in the given map,
+  searching from scratch with one of the grid planners.
+
+  In anytime mode, the 4- and 8-connected planners run weighted A* with a
+  decreasing heuristic weight, so a path is found quickly and then improved
+  until the deadline passes or the optimal path is found.
 
-  @param map: The map image with obstacles
+  @param map: The layered map
+  @param grid: The occupancy grid of the map
   @param start: The start position
   @param goal: The goal position
   @param verbose: Whether or not to print verbose output (default is False)
-  @return: The path found by the D* algorithm
+  @param planner: The grid planner ("4" or "8" for 4- or 8-connected search, "theta" for any-angle Theta*; default is "4")
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @param clearance_weight: The extra cost of a cell next to an obstacle (default is 0, no clearance costs)
+  @param deadline: The time.time() at which the search returns its best path so far (default is None, no deadline)
+  @param anytime: Whether or not to improve a quickly found path until the deadline (default is False)
+  @return: The path found by the D* algorithm (the waypoints of the path for Theta*), and its status ("optimal", "feasible", "timeout" or "no_path")
   """
 
   print("Executing D* algorithm...")
 
-  d_star_execution_time = 0
-  rows, cols, rgb = map.shape
-  open_list = []
-  heapq.heappush(open_list, (0, start))  # (cost, position)
-  came_from = {}
-  cost_so_far = { start: 0 }
-  start_time = time.time()
+  start_time = time.perf_counter()
+  heuristic_weights = (1,)
 
-  while open_list:
-    current_cost, current = heapq.heappop(open_list)
+  if anytime and planner != "theta":
+    heuristic_weights = anytime_heuristic_weights
+
+  path = []
+  status = no_path
+  path_cost = math.inf
+  expansions = 0
+
+  for heuristic_weight in heuristic_weights:
+    path_array, search_expansions = searchPath(
+      grid,
+      start,
+      goal,
+      planner,
+      robot_radius,
+      clearance_weight,
+      deadline,
+      heuristic_weight
+    )
+    expansions += search_expansions
+
+    if len(path_array) == 0:
+
+      if isExpired(deadline):
+        status = feasible if len(path) != 0 else timeout
 
-    if current == goal:
       break
 
-    # Explore neighbors
-    for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-      neighbor = (current[0] + dx, current[1] + dy)
-
-      # Verify that neighbor coordinate is within bounds and not an obstacle
-      if (
-        0 <= neighbor[0] < rows
-        and 0 <= neighbor[1] < cols
-        and str(map[neighbor[1]][neighbor[0]]) != "[0 0 0]"
-      ):
-        new_cost = cost_so_far[current] + 1
-
-        # If neighbor is not in cost_so_far or new_cost is less than
-        # cost_so_far[neighbor], update came_from/cost_so_far and add neighbor
-        # to open_list
-        if neighbor not in cost_so_far or new_cost < cost_so_far[neighbor]:
-          cost_so_far[neighbor] = new_cost
-          priority = new_cost + heuristic(goal, neighbor)
-          heapq.heappush(open_list, (priority, neighbor))
-          came_from[neighbor] = current
-
-  # Reconstruct path
-  path = []
-  
-  if goal in came_from:
-    # Record execution time
-    end_time = time.time()
-    d_star_execution_time = end_time - start_time
-    current = goal
-
-    while current != start:
-      path.append((current[0], current[1]))
-      current = came_from[current]
-    
-    path.append((start[0], start[1]))
-    # Reverse path to get start to goal order
-    path.reverse()
+    # Convert to a list of (x, y) tuples for the rest of the pipeline
+    search_path = [(x, y) for x, y in path_array.tolist()]
+    search_cost = pathCost(search_path)
+
+    # The unweighted search is optimal, even with clearance costs the
+    # Euclidean cost does not include
+    if heuristic_weight == 1 or search_cost < path_cost:
+      path = search_path
+      path_cost = search_cost
 
+    # Lazy Theta* paths are short but not always the shortest
+    status = optimal if heuristic_weight == 1 and planner != "theta" else feasible
+
+    if verbose and len(heuristic_weights) > 1:
+      print(f"Heuristic weight {heuristic_weight}: path cost {round(path_cost, 2)}")
+
+    if isExpired(deadline):
+      break
+
+  # Record execution time
+  end_time = time.perf_counter()
+  d_star_execution_time = end_time - start_time
+
+  if len(path) != 0:
     print("Path found!")
     
     if verbose:
       print("Path length:", len(path))
+      print("Path cost:", round(path_cost, 2))
   
+  elif status == timeout:
+    print("No path found before the deadline!")
   else:
-    # Record execution time
-    end_time = time.time()
-    d_star_execution_time = end_time - start_time
-
     print("No path found!")
+
+  if verbose:
+    print("Vertices expanded:", expansions)
+    print("Planner status:", status)
   
   drawInitialPoints(map, start, goal)
 
   print("D* execution time:", round(d_star_execution_time, 6), "seconds")
   print()
 
-  return path
+  return path, status
@@ -0,0 +1,449 @@
+import cv2
+import heapq
+import math
+import numpy as np
+import sys
+import time
+
+sys.path.append('./ai_robotics_final_project')
+
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.metrics import count
+from utils.points import drawInitialPoints
+
+class DStarLite:
+  """
+  Incremental D* Lite planner over an occupancy grid.
+
+  The search runs from the start to the goal; the start never moves, so
+  there is no need to search backwards from the goal as for a moving robot.
+  The g/rhs values (costs from the start) and the open list stay valid
+  between calls. When cells change, only the affected vertices are
+  updated and the next call to computeShortestPath() repairs the path instead
+  of searching the whole map again.
+  """
+
+  def __init__(
+    self,
+    grid: OccupancyGrid,
+    start: cv2.typing.Point,
+    goal: cv2.typing.Point
+  ) -> None:
+    """
+    Creates the planner and queues the start vertex.
+
+    @param grid: The occupancy grid of the map
+    @param start: The start position
+    @param goal: The goal position
+    """
+
+    self.grid = grid
+    self.width = grid.width
+    self.size = grid.width * grid.height
+    self.start = (int(start[0]), int(start[1]))
+    self.goal = (int(goal[0]), int(goal[1]))
+    self.start_index = self.start[1] * self.width + self.start[0]
+    self.goal_index = self.goal[1] * self.width + self.goal[0]
+    self.expansions = 0
+    self.heap_pushes = 0
+    self.stale_pops = 0
+    # Costs are whole numbers of steps, below 2^24 on any allowed map size,
+    # so float32 holds them exactly
+    self.g = np.full(self.size, math.inf, dtype=np.float32)
+    self.rhs = np.full(self.size, math.inf, dtype=np.float32)
+    # Keys are packed into one number, k1 * key_scale + k2, so heap entries
+    # compare on a single float; k2 stays within (-key_scale, key_scale)
+    self.key_scale = grid.width + grid.height
+    # Key each vertex is currently queued with (infinite if it is not
+    # queued); heap entries that do not match are stale and skipped when popped
+    self.queued_key = np.full(self.size, math.inf)
+    self.open_list = []
+    # Memoryviews give fast scalar access to the arrays in the search loop
+    self._blocked = memoryview(grid.flat)
+    self._g = memoryview(self.g)
+    self._rhs = memoryview(self.rhs)
+    self._queued_key = memoryview(self.queued_key)
+    self.rhs[self.start_index] = 0
+    self.updateVertex(self.start_index)
+
+  def heuristic(self, index: int) -> int:
+    """
+    Finds the Manhattan distance between a vertex and the goal.
+
+    @param index: The flat index of the vertex
+    @return: The Manhattan distance to the goal
+    """
+
+    y, x = divmod(index, self.width)
+
+    return abs(x - self.goal[0]) + abs(y - self.goal[1])
+
+  def neighbors(self, index: int) -> list:
+    """
+    Finds the 4-connected neighbors of a vertex that are within the grid.
+
+    @param index: The flat index of the vertex
+    @return: The flat indices of the neighbors
+    """
+
+    width = self.width
+    x = index % width
+    neighbors = []
+
+    if x > 0:
+      neighbors.append(index - 1)
+
+    if x < width - 1:
+      neighbors.append(index + 1)
+
+    if index >= width:
+      neighbors.append(index - width)
+
+    if index < self.size - width:
+      neighbors.append(index + width)
+
+    return neighbors
+
+  def computeRhs(self, index: int) -> float:
+    """
+    Finds the one-step lookahead value of a vertex.
+
+    @param index: The flat index of the vertex
+    @return: The minimum cost through any neighbor
+    """
+
+    blocked = self._blocked
+
+    if blocked[index]:
+      return math.inf
+
+    g = self._g
+    rhs = math.inf
+
+    for neighbor in self.neighbors(index):
+
+      if not blocked[neighbor] and g[neighbor] + 1 < rhs:
+        rhs = g[neighbor] + 1
+
+    return rhs
+
+  def calculateKey(self, index: int) -> float:
+    """
+    Calculates the priority of a vertex. Ties on k1 go to the vertex closest
+    to the goal, like the (f, h) ordering of searchGrid(), so the search
+    follows the path instead of flooding the plateau of equal k1. An
+    underconsistent vertex goes before all of them, since its g may be too
+    low for the path to use.
+
+    @param index: The flat index of the vertex
+    @return: The packed (k1, k2) priority of the vertex, where k2 is -1 for an underconsistent vertex and its heuristic otherwise
+    """
+
+    g = self._g[index]
+    rhs = self._rhs[index]
+    heuristic = self.heuristic(index)
+
+    if g < rhs:
+      return (g + heuristic) * self.key_scale - 1
+
+    return (rhs + heuristic) * self.key_scale + heuristic
+
+  def updateVertex(self, index: int) -> None:
+    """
+    Queues a vertex if it is inconsistent, otherwise removes it from the queue.
+
+    @param index: The flat index of the vertex
+    """
+
+    if self._g[index] != self._rhs[index]:
+      key = self.calculateKey(index)
+      self._queued_key[index] = key
+      heapq.heappush(self.open_list, (key, index))
+      self.heap_pushes += 1
+    else:
+      self._queued_key[index] = math.inf
+
+  def computeShortestPath(self) -> bool:
+    """
+    Expands inconsistent vertices until the goal is consistent.
+
+    @return: True if the goal is reachable from the start, False otherwise
+    """
+
+    open_list = self.open_list
+    blocked = self._blocked
+    g = self._g
+    rhs = self._rhs
+    queued_key = self._queued_key
+    key_scale = self.key_scale
+    width = self.width
+    size = self.size
+    goal_x, goal_y = self.goal
+    start_index = self.start_index
+    goal_index = self.goal_index
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+    # Counted locally in the loop, and added to the totals at the end
+    expansions = 0
+    heap_pushes = 0
+    stale_pops = 0
+
+    while open_list:
+      key, index = heappop(open_list)
+
+      # Skip stale entries
+      if key != queued_key[index]:
+        stale_pops += 1
+        continue
+
+      # Stop once the goal is consistent and its key, (g, 0), is not above
+      # the smallest key; the vertex stays queued for the next call
+      goal_cost = rhs[goal_index]
+
+      if key >= goal_cost * key_scale and goal_cost == g[goal_index]:
+        heappush(open_list, (key, index))
+        heap_pushes += 1
+        break
+
+      expansions += 1
+
+      if g[index] > rhs[index]:
+        # Overconsistent: settle the vertex and relax its neighbors. The
+        # neighbors and keys are inlined, as this runs for every vertex of
+        # the initial search
+        cost = rhs[index] + 1
+        g[index] = cost - 1
+        queued_key[index] = math.inf
+        y, x = divmod(index, width)
+
+        for neighbor in (
+          index - 1 if x > 0 else -1,
+          index + 1 if x < width - 1 else -1,
+          index - width,
+          index + width if index + width < size else -1
+        ):
+
+          # A neighbor whose rhs does not drop keeps its key; the rhs of
+          # the start is 0, so it never drops
+          if (
+            neighbor >= 0
+            and cost < rhs[neighbor]
+            and not blocked[neighbor]
+          ):
+            rhs[neighbor] = cost
+            neighbor_y, neighbor_x = divmod(neighbor, width)
+            heuristic = abs(neighbor_x - goal_x) + abs(neighbor_y - goal_y)
+
+            if g[neighbor] < cost:
+              key = (g[neighbor] + heuristic) * key_scale - 1
+            elif g[neighbor] > cost:
+              key = (cost + heuristic) * key_scale + heuristic
+            else:
+              queued_key[neighbor] = math.inf
+              continue
+
+            queued_key[neighbor] = key
+            heappush(open_list, (key, neighbor))
+            heap_pushes += 1
+
+      else:
+        # Underconsistent: invalidate the vertex and anything that used it.
+        # Only the vertices whose rhs may change are updated; the others keep
+        # their keys
+        old_cost = g[index] + 1
+        g[index] = math.inf
+        y, x = divmod(index, width)
+
+        for neighbor in (
+          index,
+          index - 1 if x > 0 else -1,
+          index + 1 if x < width - 1 else -1,
+          index - width,
+          index + width if index + width < size else -1
+        ):
+
+          if neighbor != index and (
+            neighbor < 0
+            or rhs[neighbor] != old_cost
+          ):
+            continue
+
+          neighbor_y, neighbor_x = divmod(neighbor, width)
+
+          if neighbor != start_index:
+            # Recompute the rhs from the neighbors of the neighbor
+            neighbor_rhs = math.inf
+
+            if not blocked[neighbor]:
+
+              for next_neighbor in (
+                neighbor - 1 if neighbor_x > 0 else -1,
+                neighbor + 1 if neighbor_x < width - 1 else -1,
+                neighbor - width,
+                neighbor + width if neighbor + width < size else -1
+              ):
+
+                if (
+                  next_neighbor >= 0
+                  and not blocked[next_neighbor]
+                  and g[next_neighbor] + 1 < neighbor_rhs
+                ):
+                  neighbor_rhs = g[next_neighbor] + 1
+
+            # A neighbor with another parent of the same cost keeps its key
+            if neighbor != index and neighbor_rhs == old_cost:
+              continue
+
+            rhs[neighbor] = neighbor_rhs
+
+          heuristic = abs(neighbor_x - goal_x) + abs(neighbor_y - goal_y)
+
+          if g[neighbor] < rhs[neighbor]:
+            key = (g[neighbor] + heuristic) * key_scale - 1
+          elif g[neighbor] > rhs[neighbor]:
+            key = (rhs[neighbor] + heuristic) * key_scale + heuristic
+          else:
+            queued_key[neighbor] = math.inf
+            continue
+
+          queued_key[neighbor] = key
+          heappush(open_list, (key, neighbor))
+          heap_pushes += 1
+
+    self.expansions += expansions
+    self.heap_pushes += heap_pushes
+    self.stale_pops += stale_pops
+
+    return g[goal_index] != math.inf
+
+  def updateCells(self, cells: np.ndarray) -> None:
+    """
+    Updates the vertices affected by cells whose occupancy changed.
+
+    @param cells: The (x, y) coordinates of the changed cells, as an Nx2 array
+    """
+
+    affected = set()
+
+    for x, y in cells:
+      index = int(y) * self.width + int(x)
+      affected.add(index)
+      affected.update(self.neighbors(index))
+
+    for index in affected:
+
+      if index != self.start_index:
+        self._rhs[index] = self.computeRhs(index)
+
+      self.updateVertex(index)
+
+  def extractPath(self) -> list:
+    """
+    Follows the lowest cost neighbors back from the goal to the start.
+
+    @return: The path from the start to the goal, or an empty list
+    """
+
+    blocked = self._blocked
+    g = self._g
+    width = self.width
+    size = self.size
+    index = self.goal_index
+
+    if g[index] == math.inf:
+      return []
+
+    path = [self.goal]
+
+    while index != self.start_index and len(path) <= size:
+      next_index = None
+      next_cost = math.inf
+      x = index % width
+
+      for neighbor in (
+        index - 1 if x > 0 else -1,
+        index + 1 if x < width - 1 else -1,
+        index - width,
+        index + width if index + width < size else -1
+      ):
+
+        if (
+          neighbor >= 0
+          and not blocked[neighbor]
+          and g[neighbor] < next_cost
+        ):
+          next_index = neighbor
+          next_cost = g[neighbor]
+
+      if next_index is None:
+        return []
+
+      index = next_index
+      y, x = divmod(index, width)
+      path.append((x, y))
+
+    return path[::-1]
+
+def executeDStarLite(
+  map: LayeredMap,
+  planner: DStarLite,
+  changed_cells: np.ndarray = None,
+  verbose: bool = False
+) -> list:
+  """
+  Run (or repair) the D* Lite search to find the shortest path in the given
+  map, reusing the planner's previous search state.
+
+  @param map: The layered map
+  @param planner: The persistent D* Lite planner for the map
+  @param changed_cells: The (x, y) coordinates of cells that changed since the last run (default is None)
+  @param verbose: Whether or not to print verbose output (default is False)
+  @return: The path found by the D* Lite algorithm
+  """
+
+  print("Executing D* algorithm...")
+
+  start_time = time.perf_counter()
+  expansions = planner.expansions
+  heap_pushes = planner.heap_pushes
+  stale_pops = planner.stale_pops
+
+  if changed_cells is not None:
+    planner.updateCells(changed_cells)
+
+  path = []
+
+  # Skip the search when the start and goal are not connected, instead of
+  # expanding the whole component of the start
+  if (
+    planner.grid.areConnected(planner.start, planner.goal)
+    and planner.computeShortestPath()
+  ):
+    path = planner.extractPath()
+
+  # Record execution time
+  end_time = time.perf_counter()
+  d_star_execution_time = end_time - start_time
+  count("d_star_lite.expansions", planner.expansions - expansions)
+  count("d_star_lite.heap_pushes", planner.heap_pushes - heap_pushes)
+  count("d_star_lite.stale_pops", planner.stale_pops - stale_pops)
+
+  if len(path) != 0:
+    print("Path found!")
+
+    if verbose:
+      print("Path length:", len(path))
+
+  else:
+    print("No path found!")
+
+  if verbose:
+    print("Vertices expanded:", planner.expansions - expansions)
+
+  drawInitialPoints(map, planner.start, planner.goal)
+
+  print("D* execution time:", round(d_star_execution_time, 6), "seconds")
+  print()
+
+  return path
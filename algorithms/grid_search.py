@@ -0,0 +1,418 @@
+import cv2
+import heapq
+import math
+import numpy as np
+import sys
+import time
+
+sys.path.append('./ai_robotics_final_project')
+
+from maps.occupancy_grid import OccupancyGrid
+from utils.metrics import count
+from utils.points import blockedCells, isCollisionFree
+from utils.profiling import snapshotMemory
+
+# (dx, dy) moves of the 4-connected neighborhood
+four_connected_moves = ((-1, 0), (1, 0), (0, -1), (0, 1))
+# (dx, dy) moves of the 8-connected neighborhood
+eight_connected_moves = four_connected_moves + ((-1, -1), (1, -1), (-1, 1), (1, 1))
+# Number of expansions between deadline checks
+deadline_check_interval = 1024
+
+def searchPath(
+  grid: OccupancyGrid,
+  start: cv2.typing.Point,
+  goal: cv2.typing.Point,
+  planner: str = "4",
+  robot_radius: float = 0,
+  clearance_weight: float = 0,
+  deadline: float = None,
+  heuristic_weight: float = 1
+) -> tuple:
+  """
+  Finds a path between two cells with one of the grid planners.
+
+  @param grid: The occupancy grid of the map
+  @param start: The start position
+  @param goal: The goal position
+  @param planner: The grid planner ("4", "8" or "theta"; default is "4")
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @param clearance_weight: The extra cost of a cell next to an obstacle, for the 4- and 8-connected planners (default is 0, no clearance costs)
+  @param deadline: The time.time() at which the search gives up (default is None, no deadline)
+  @param heuristic_weight: The inflation of the heuristic of the 4- and 8-connected planners (default is 1, optimal paths)
+  @return: The path as an Nx2 array of (x, y) coordinates (waypoints for Theta*), and the number of cells expanded
+  """
+
+  if planner == "theta":
+    return searchThetaStar(grid, start, goal, robot_radius, deadline)
+
+  if planner in ("4", "8"):
+    return searchGrid(
+      grid,
+      start,
+      goal,
+      int(planner),
+      robot_radius,
+      clearance_weight,
+      deadline,
+      heuristic_weight
+    )
+
+  raise ValueError(f"Unknown grid planner '{planner}'.")
+
+def searchGrid(
+  grid: OccupancyGrid,
+  start: cv2.typing.Point,
+  goal: cv2.typing.Point,
+  connectivity: int = 4,
+  robot_radius: float = 0,
+  clearance_weight: float = 0,
+  deadline: float = None,
+  heuristic_weight: float = 1
+) -> tuple:
+  """
+  Finds the shortest 4- or 8-connected path between two cells with A*. The
+  4-connected search uses the Manhattan heuristic; the 8-connected search
+  moves diagonally at a cost of sqrt(2), never cuts the corner of an
+  obstacle and uses the octile heuristic. The 8-connected costs are integers
+  (1000 per straight move, 1414 per diagonal move), so paths of equal length
+  tie exactly and the tie-breaking towards the goal keeps the search narrow.
+
+  With a robot radius, the search runs on the obstacles inflated by the
+  radius. With a clearance weight, entering a cell also costs its clearance
+  penalty, so paths keep away from obstacles where that is cheap. A
+  heuristic weight above 1 makes the search weighted A*: it expands fewer
+  cells, and its path costs at most the weight times the optimal cost.
+
+  Cells are addressed by flat index (y * width + x), and the g-costs, parents
+  and closed set live in preallocated arrays sized to the map, so the search
+  loop only allocates its heap entries. Stale heap entries (cells that were
+  pushed again with a lower cost) are skipped when popped. Cells in different
+  components of free space are rejected before searching.
+
+  @param grid: The occupancy grid of the map
+  @param start: The start position
+  @param goal: The goal position
+  @param connectivity: The number of neighbors of a cell (4 or 8; default is 4)
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @param clearance_weight: The extra cost of a cell next to an obstacle, relative to a straight move (default is 0, no clearance costs)
+  @param deadline: The time.time() at which the search gives up (default is None, no deadline)
+  @param heuristic_weight: The inflation of the heuristic (default is 1, optimal paths)
+  @return: The path from start to goal as an Nx2 array of (x, y) coordinates (empty if no path exists or the deadline passed), and the number of cells expanded
+  """
+
+  # Without a path the search would expand the whole component of the start
+  if not grid.areConnected(start, goal, robot_radius):
+    return np.empty((0, 2), dtype=np.int32), 0
+
+  width = grid.width
+  height = grid.height
+  size = width * height
+  start_x, start_y = int(start[0]), int(start[1])
+  goal_x, goal_y = int(goal[0]), int(goal[1])
+  start_index = start_y * width + start_x
+  goal_index = goal_y * width + goal_x
+  diagonal = connectivity == 8
+  straight_cost = 1000 if diagonal else 1
+  diagonal_cost = 1414
+  moves = tuple(
+    (dx, dy, dy * width + dx, diagonal_cost if dx != 0 and dy != 0 else straight_cost)
+    for dx, dy in (eight_connected_moves if diagonal else four_connected_moves)
+  )
+  weighted = clearance_weight > 0
+
+  if weighted:
+    g_cost = np.full(size, math.inf)
+    penalty_view = memoryview(
+      grid.clearanceMap().penaltyCosts(clearance_weight * straight_cost)
+    )
+  else:
+    g_cost = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+
+  parent = np.full(size, -1, dtype=np.int32)
+  closed = np.zeros(size, dtype=np.uint8)
+  # Memoryviews give fast scalar access to the arrays in the search loop
+  blocked_view = memoryview(blockedCells(grid, robot_radius))
+  g_view = memoryview(g_cost)
+  parent_view = memoryview(parent)
+  closed_view = memoryview(closed)
+  g_view[start_index] = 0
+  # The octile distance is the Manhattan distance less (2 - sqrt(2)) for
+  # each diagonal step; without diagonal moves it is the Manhattan distance
+  diagonal_saving = diagonal_cost - 2 * straight_cost if diagonal else 0
+  start_dx = abs(goal_x - start_x)
+  start_dy = abs(goal_y - start_y)
+  start_heuristic = heuristic_weight * (
+    straight_cost * (start_dx + start_dy)
+    + diagonal_saving * min(start_dx, start_dy)
+  )
+  # Entries are (f, h, index), so ties on f prefer cells closer to the goal
+  open_list = [(start_heuristic, start_heuristic, start_index)]
+  expansions = 0
+  heap_pushes = 1
+  stale_pops = 0
+  found = False
+
+  while open_list:
+    _, _, index = heapq.heappop(open_list)
+
+    # Skip stale entries for cells that were already expanded
+    if closed_view[index]:
+      stale_pops += 1
+      continue
+
+    if index == goal_index:
+      found = True
+      break
+
+    closed_view[index] = 1
+    expansions += 1
+
+    if (
+      deadline is not None
+      and expansions % deadline_check_interval == 0
+      and time.time() >= deadline
+    ):
+      break
+
+    y, x = divmod(index, width)
+    cost = g_view[index]
+
+    for dx, dy, step, move_cost in moves:
+      neighbor_x = x + dx
+      neighbor_y = y + dy
+
+      if 0 <= neighbor_x < width and 0 <= neighbor_y < height:
+        neighbor = index + step
+        new_cost = cost + move_cost
+
+        if weighted:
+          new_cost += penalty_view[neighbor]
+
+        if (
+          not blocked_view[neighbor]
+          and not closed_view[neighbor]
+          and new_cost < g_view[neighbor]
+          # A diagonal move may not cut the corner of an obstacle
+          and (
+            dx == 0
+            or dy == 0
+            or not (blocked_view[index + dx] or blocked_view[index + dy * width])
+          )
+        ):
+          g_view[neighbor] = new_cost
+          parent_view[neighbor] = index
+          heuristic_dx = abs(goal_x - neighbor_x)
+          heuristic_dy = abs(goal_y - neighbor_y)
+          heuristic = heuristic_weight * (
+            straight_cost * (heuristic_dx + heuristic_dy)
+            + diagonal_saving * (heuristic_dx if heuristic_dx < heuristic_dy else heuristic_dy)
+          )
+          heapq.heappush(
+            open_list,
+            (new_cost + heuristic, heuristic, neighbor)
+          )
+          heap_pushes += 1
+
+  snapshotMemory("end of grid search")
+  count("grid_search.expansions", expansions)
+  count("grid_search.heap_pushes", heap_pushes)
+  count("grid_search.stale_pops", stale_pops)
+
+  if not found:
+    return np.empty((0, 2), dtype=np.int32), expansions
+
+  return tracePath(parent_view, start_index, goal_index, width), expansions
+
+def searchThetaStar(
+  grid: OccupancyGrid,
+  start: cv2.typing.Point,
+  goal: cv2.typing.Point,
+  robot_radius: float = 0,
+  deadline: float = None
+) -> tuple:
+  """
+  Finds an any-angle path between two cells with (Lazy) Theta*. The search
+  expands 8-connected neighbors like A*, but links each neighbor to the
+  parent of the expanded cell, so paths are not bound to grid directions and
+  only their turning points are kept as waypoints.
+
+  The line of sight to the parent is only checked when a cell is expanded,
+  one check per expansion instead of one per neighbor, with the same raster
+  lines as the RRT collision checks. A cell that cannot see its parent is
+  linked to its best expanded neighbor instead. Costs and the heuristic are
+  Euclidean distances. With a robot radius, the search and the line of sight
+  checks run on the obstacles inflated by the radius.
+
+  @param grid: The occupancy grid of the map
+  @param start: The start position
+  @param goal: The goal position
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @param deadline: The time.time() at which the search gives up (default is None, no deadline)
+  @return: The waypoints from start to goal as an Nx2 array of (x, y) coordinates (empty if no path exists or the deadline passed), and the number of cells expanded
+  """
+
+  if not grid.areConnected(start, goal, robot_radius):
+    return np.empty((0, 2), dtype=np.int32), 0
+
+  width = grid.width
+  height = grid.height
+  size = width * height
+  start_x, start_y = int(start[0]), int(start[1])
+  goal_x, goal_y = int(goal[0]), int(goal[1])
+  start_index = start_y * width + start_x
+  goal_index = goal_y * width + goal_x
+  moves = tuple(
+    (dx, dy, dy * width + dx, math.hypot(dx, dy))
+    for dx, dy in eight_connected_moves
+  )
+  g_cost = np.full(size, math.inf)
+  parent = np.full(size, -1, dtype=np.int32)
+  closed = np.zeros(size, dtype=np.uint8)
+  blocked_view = memoryview(blockedCells(grid, robot_radius))
+  g_view = memoryview(g_cost)
+  parent_view = memoryview(parent)
+  closed_view = memoryview(closed)
+  g_view[start_index] = 0
+  # The start is its own parent, so its neighbors are linked to it
+  parent_view[start_index] = start_index
+  start_heuristic = math.hypot(goal_x - start_x, goal_y - start_y)
+  open_list = [(start_heuristic, start_heuristic, start_index)]
+  expansions = 0
+  heap_pushes = 1
+  stale_pops = 0
+  line_of_sight_checks = 0
+  found = False
+
+  while open_list:
+    _, _, index = heapq.heappop(open_list)
+
+    if closed_view[index]:
+      stale_pops += 1
+      continue
+
+    closed_view[index] = 1
+    y, x = divmod(index, width)
+    parent_index = parent_view[index]
+    parent_y, parent_x = divmod(parent_index, width)
+
+    if parent_index != index:
+      line_of_sight_checks += 1
+
+    if parent_index != index and not isCollisionFree(
+      grid,
+      (parent_x, parent_y),
+      (x, y),
+      robot_radius
+    ):
+      # The parent is out of sight; link to the best expanded neighbor
+      best_cost = math.inf
+
+      for dx, dy, step, move_cost in moves:
+        neighbor_x = x + dx
+        neighbor_y = y + dy
+
+        if (
+          0 <= neighbor_x < width
+          and 0 <= neighbor_y < height
+          and closed_view[index + step]
+          and g_view[index + step] + move_cost < best_cost
+          and (
+            dx == 0
+            or dy == 0
+            or not (blocked_view[index + dx] or blocked_view[index + dy * width])
+          )
+        ):
+          best_cost = g_view[index + step] + move_cost
+          parent_view[index] = index + step
+
+      g_view[index] = best_cost
+      parent_index = parent_view[index]
+      parent_y, parent_x = divmod(parent_index, width)
+
+    if index == goal_index:
+      found = True
+      break
+
+    expansions += 1
+
+    if (
+      deadline is not None
+      and expansions % deadline_check_interval == 0
+      and time.time() >= deadline
+    ):
+      break
+
+    parent_cost = g_view[parent_index]
+
+    for dx, dy, step, move_cost in moves:
+      neighbor_x = x + dx
+      neighbor_y = y + dy
+
+      if 0 <= neighbor_x < width and 0 <= neighbor_y < height:
+        neighbor = index + step
+
+        if (
+          not blocked_view[neighbor]
+          and not closed_view[neighbor]
+          and (
+            dx == 0
+            or dy == 0
+            or not (blocked_view[index + dx] or blocked_view[index + dy * width])
+          )
+        ):
+          # Assume the neighbor can see the parent; checked when it is expanded
+          new_cost = parent_cost + math.hypot(
+            neighbor_x - parent_x,
+            neighbor_y - parent_y
+          )
+
+          if new_cost < g_view[neighbor]:
+            g_view[neighbor] = new_cost
+            parent_view[neighbor] = parent_index
+            heuristic = math.hypot(goal_x - neighbor_x, goal_y - neighbor_y)
+            heapq.heappush(
+              open_list,
+              (new_cost + heuristic, heuristic, neighbor)
+            )
+            heap_pushes += 1
+
+  snapshotMemory("end of Theta* search")
+  count("theta_star.expansions", expansions)
+  count("theta_star.heap_pushes", heap_pushes)
+  count("theta_star.stale_pops", stale_pops)
+  count("theta_star.line_of_sight_checks", line_of_sight_checks)
+
+  if not found:
+    return np.empty((0, 2), dtype=np.int32), expansions
+
+  parent_view[start_index] = -1
+
+  return tracePath(parent_view, start_index, goal_index, width), expansions
+
+def tracePath(
+  parent_view: memoryview,
+  start_index: int,
+  goal_index: int,
+  width: int
+) -> np.ndarray:
+  """
+  Reconstructs a path by chasing parent indices back from the goal.
+
+  @param parent_view: The flat index of the parent of each cell
+  @param start_index: The flat index of the start
+  @param goal_index: The flat index of the goal
+  @param width: The width of the map
+  @return: The path from start to goal as an Nx2 array of (x, y) coordinates
+  """
+
+  indices = [goal_index]
+  index = goal_index
+
+  while index != start_index:
+    index = parent_view[index]
+    indices.append(index)
+
+  indices = np.array(indices[::-1], dtype=np.int32)
+
+  return np.stack((indices % width, indices // width), axis=1)
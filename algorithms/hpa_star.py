@@ -0,0 +1,720 @@
+import cv2
+import heapq
+import math
+import numpy as np
+import sys
+import time
+
+sys.path.append('./ai_robotics_final_project')
+
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.metrics import count
+from utils.points import blockedCells, drawInitialPoints
+
+# Entrances at least this wide get a transition at each end, instead of one
+# in the middle
+wide_entrance_width = 6
+# Kernel that grows a wavefront by one 4-connected step
+four_connected_kernel = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+
+class HPAStar:
+  """
+  Hierarchical path-finding A* (HPA*) planner over an occupancy grid.
+
+  The grid is split into square clusters. Each run of free cells along the
+  border of two clusters is an entrance, crossed by one transition (a pair of
+  facing cells, one in each cluster) in its middle, or by one at each end
+  when it is wide. The cells of the transitions are the nodes of an abstract
+  graph, which links the two cells of each transition at a cost of 1, and the
+  nodes of each cluster by their 4-connected distances inside the cluster.
+  The graph is built once, when the planner is created.
+
+  A query links the start and goal to the nodes of their clusters, searches
+  the abstract graph with A*, and refines each abstract edge to cells with a
+  search inside its cluster, so its cost grows with the number of clusters
+  crossed instead of the number of cells. When cells change, only the
+  clusters around them, and the abstract edges of their neighbors, are
+  recomputed.
+  """
+
+  def __init__(
+    self,
+    grid: OccupancyGrid,
+    cluster_size: int = 32,
+    robot_radius: float = 0
+  ) -> None:
+    """
+    Builds the abstract graph of the grid.
+
+    @param grid: The occupancy grid of the map
+    @param cluster_size: The length and width of a cluster, in pixels (default is 32)
+    @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+    """
+
+    self.grid = grid
+    self.width = grid.width
+    self.height = grid.height
+    self.cluster_size = max(int(cluster_size), 1)
+    self.robot_radius = robot_radius
+    self.cluster_columns = -(-self.width // self.cluster_size)
+    self.cluster_rows = -(-self.height // self.cluster_size)
+    self.blocked = blockedCells(grid, robot_radius)
+    self.abstract_expansions = 0
+    self.cluster_searches = 0
+    self.clusters_updated = 0
+    # Transitions of each border, as (node in the first cluster, node in the
+    # second cluster) flat indices; a border is keyed by its first cluster and
+    # its orientation (0 = the cluster to the right, 1 = the cluster below)
+    self.transitions = {}
+    # Abstract edges, as the cost to each neighbor of each node
+    self.edges = {}
+    # Nodes of each cluster, keyed by (cluster_x, cluster_y)
+    self.cluster_nodes = {}
+    cluster_size = self.cluster_size
+    padded = np.zeros(
+      (self.cluster_rows * cluster_size, self.cluster_columns * cluster_size),
+      dtype=bool
+    )
+    padded[:self.height, :self.width] = self.blocked.reshape(self.height, self.width) != 0
+    # Whether or not each cluster is free of obstacles, where distances are
+    # Manhattan distances
+    self.obstacle_free = ~padded.reshape(
+      self.cluster_rows,
+      cluster_size,
+      self.cluster_columns,
+      cluster_size
+    ).any(axis=(1, 3))
+    borders = [
+      (cluster_x, cluster_y, orientation)
+      for cluster_y in range(self.cluster_rows)
+      for cluster_x in range(self.cluster_columns)
+      for orientation in (0, 1)
+      if self._hasBorder(cluster_x, cluster_y, orientation)
+    ]
+    self._findTransitions(borders)
+
+    for cluster_y in range(self.cluster_rows):
+
+      for cluster_x in range(self.cluster_columns):
+        self._linkCluster((cluster_x, cluster_y))
+
+  def clusterOf(self, index: int) -> tuple:
+    """
+    Finds the cluster of a cell.
+
+    @param index: The flat index of the cell
+    @return: The (cluster_x, cluster_y) coordinates of the cluster
+    """
+
+    y, x = divmod(index, self.width)
+
+    return (x // self.cluster_size, y // self.cluster_size)
+
+  def findPath(self, start: cv2.typing.Point, goal: cv2.typing.Point) -> list:
+    """
+    Finds a path between two cells: an abstract path through the cluster
+    entrances, refined to cells.
+
+    @param start: The start position
+    @param goal: The goal position
+    @return: The 4-connected path from the start to the goal, or an empty list
+    """
+
+    if not self.grid.areConnected(start, goal, self.robot_radius):
+      return []
+
+    width = self.width
+    start_index = int(start[1]) * width + int(start[0])
+    goal_index = int(goal[1]) * width + int(goal[0])
+
+    if start_index == goal_index:
+      return [(int(start[0]), int(start[1]))]
+
+    # Link the start and goal to the nodes of their clusters (and to each
+    # other, when they share a cluster)
+    start_links = self._clusterLinks(start_index, goal_index)
+    goal_links = self._clusterLinks(goal_index, start_index)
+    abstract_path = self._searchAbstract(
+      start_index,
+      goal_index,
+      start_links,
+      goal_links
+    )
+
+    if len(abstract_path) == 0:
+      return []
+
+    path = [(int(start[0]), int(start[1]))]
+
+    for node, next_node in zip(abstract_path, abstract_path[1:]):
+
+      if self.clusterOf(node) != self.clusterOf(next_node):
+        # The two cells of a transition are next to each other
+        y, x = divmod(next_node, width)
+        path.append((x, y))
+      else:
+        path.extend(self._refineEdge(node, next_node)[1:])
+
+    return path
+
+  def updateCells(self, cells: np.ndarray) -> None:
+    """
+    Recomputes the clusters around cells whose occupancy changed: their
+    entrances, and the abstract edges inside them and their neighbors.
+
+    @param cells: The (x, y) coordinates of the changed cells, as an Nx2 array
+    """
+
+    if len(cells) == 0:
+      return
+
+    cluster_size = self.cluster_size
+    self.blocked = blockedCells(self.grid, self.robot_radius)
+    # With a robot radius, cells within the radius of the changed cells may
+    # become blocked too
+    margin = math.ceil(self.robot_radius) + 1 if self.robot_radius > 0 else 0
+    cells = np.asarray(cells, dtype=np.int64)
+    ranges = np.unique(
+      np.stack(
+        (
+          np.clip((cells[:, 0] - margin) // cluster_size, 0, self.cluster_columns - 1),
+          np.clip((cells[:, 0] + margin) // cluster_size, 0, self.cluster_columns - 1),
+          np.clip((cells[:, 1] - margin) // cluster_size, 0, self.cluster_rows - 1),
+          np.clip((cells[:, 1] + margin) // cluster_size, 0, self.cluster_rows - 1)
+        ),
+        axis=1
+      ),
+      axis=0
+    )
+    touched = set()
+
+    for min_x, max_x, min_y, max_y in ranges.tolist():
+
+      for cluster_y in range(min_y, max_y + 1):
+
+        for cluster_x in range(min_x, max_x + 1):
+          touched.add((cluster_x, cluster_y))
+
+    borders = set()
+    relinked = set(touched)
+    blocked = self.blocked.reshape(self.height, self.width)
+
+    for cluster_x, cluster_y in touched:
+      x_min, y_min, x_max, y_max = self._clusterBounds(cluster_x, cluster_y)
+      self.obstacle_free[cluster_y, cluster_x] = not blocked[y_min:y_max, x_min:x_max].any()
+
+      for border, neighbor in (
+        ((cluster_x, cluster_y, 0), (cluster_x + 1, cluster_y)),
+        ((cluster_x, cluster_y, 1), (cluster_x, cluster_y + 1)),
+        ((cluster_x - 1, cluster_y, 0), (cluster_x - 1, cluster_y)),
+        ((cluster_x, cluster_y - 1, 1), (cluster_x, cluster_y - 1))
+      ):
+
+        if self._hasBorder(*border):
+          borders.add(border)
+          relinked.add(neighbor)
+
+    for border in borders:
+
+      for node, other_node in self.transitions.pop(border):
+        self._unlink(node, other_node)
+
+    self._findTransitions(sorted(borders))
+
+    for cluster in sorted(relinked):
+      self._linkCluster(cluster)
+
+    self.clusters_updated += len(relinked)
+
+  def _clusterBounds(self, cluster_x: int, cluster_y: int) -> tuple:
+    """
+    Finds the cells of a cluster, which is cut short at the map edges.
+
+    @param cluster_x: The x-coordinate of the cluster
+    @param cluster_y: The y-coordinate of the cluster
+    @return: The (x_min, y_min, x_max, y_max) bounds of the cluster, exclusive of the maximums
+    """
+
+    cluster_size = self.cluster_size
+
+    return (
+      cluster_x * cluster_size,
+      cluster_y * cluster_size,
+      min((cluster_x + 1) * cluster_size, self.width),
+      min((cluster_y + 1) * cluster_size, self.height)
+    )
+
+  def _hasBorder(self, cluster_x: int, cluster_y: int, orientation: int) -> bool:
+    """
+    Checks if a cluster has a neighbor to its right or below it.
+
+    @param cluster_x: The x-coordinate of the cluster
+    @param cluster_y: The y-coordinate of the cluster
+    @param orientation: 0 for the neighbor to the right, 1 for the neighbor below
+    @return: True if both clusters are within the grid, False otherwise
+    """
+
+    if not (0 <= cluster_x < self.cluster_columns and 0 <= cluster_y < self.cluster_rows):
+      return False
+
+    if orientation == 0:
+      return cluster_x + 1 < self.cluster_columns
+
+    return cluster_y + 1 < self.cluster_rows
+
+  def _findTransitions(self, borders: list) -> None:
+    """
+    Finds the entrances of borders and links the cells of their transitions.
+    The entrances of all the borders with the same orientation are found at
+    once, as the runs of free cell pairs in one array.
+
+    @param borders: The (cluster_x, cluster_y, orientation) keys of the borders
+    """
+
+    cluster_size = self.cluster_size
+    width = self.width
+    blocked = self.blocked
+    offsets = np.arange(cluster_size)
+
+    for orientation in (0, 1):
+      keys = [border for border in borders if border[2] == orientation]
+
+      for key in keys:
+        self.transitions[key] = []
+
+      if len(keys) == 0:
+        continue
+
+      keys_array = np.array(keys, dtype=np.int64)
+      cluster_x = keys_array[:, 0:1]
+      cluster_y = keys_array[:, 1:2]
+
+      if orientation == 0:
+        # The last column of the cluster faces the first column of the next
+        ys = cluster_y * cluster_size + offsets
+        in_map = ys < self.height
+        first = np.minimum(ys, self.height - 1) * width + (cluster_x + 1) * cluster_size - 1
+        second = first + 1
+      else:
+        # The last row of the cluster faces the first row of the next
+        xs = cluster_x * cluster_size + offsets
+        in_map = xs < width
+        first = ((cluster_y + 1) * cluster_size - 1) * width + np.minimum(xs, width - 1)
+        second = first + width
+
+      crossable = np.zeros((len(keys), cluster_size + 2), dtype=bool)
+      crossable[:, 1:-1] = in_map & (blocked[first] == 0) & (blocked[second] == 0)
+      # The starts and ends of the runs come out in the same order
+      rows, run_starts = np.nonzero(crossable[:, 1:-1] & ~crossable[:, :-2])
+      _, run_ends = np.nonzero(crossable[:, 1:-1] & ~crossable[:, 2:])
+      wide = run_ends - run_starts + 1 >= wide_entrance_width
+      rows = np.concatenate((rows[~wide], rows[wide], rows[wide]))
+      positions = np.concatenate((
+        (run_starts[~wide] + run_ends[~wide]) // 2,
+        run_starts[wide],
+        run_ends[wide]
+      ))
+
+      for row, node, other_node in zip(
+        rows.tolist(),
+        first[rows, positions].tolist(),
+        second[rows, positions].tolist()
+      ):
+        self.transitions[keys[row]].append((node, other_node))
+        self.edges.setdefault(node, {})[other_node] = 1
+        self.edges.setdefault(other_node, {})[node] = 1
+
+  def _linkCluster(self, cluster: tuple) -> None:
+    """
+    Replaces the abstract edges inside a cluster with the distances between
+    its current nodes.
+
+    @param cluster: The (cluster_x, cluster_y) coordinates of the cluster
+    """
+
+    cluster_x, cluster_y = cluster
+    edges = self.edges
+    old_nodes = self.cluster_nodes.pop(cluster, [])
+
+    for node in old_nodes:
+
+      for neighbor in old_nodes:
+
+        if neighbor in edges.get(node, {}):
+          self._unlink(node, neighbor)
+
+    nodes = set()
+
+    for border, side in (
+      ((cluster_x, cluster_y, 0), 0),
+      ((cluster_x, cluster_y, 1), 0),
+      ((cluster_x - 1, cluster_y, 0), 1),
+      ((cluster_x, cluster_y - 1, 1), 1)
+    ):
+
+      for transition in self.transitions.get(border, ()):
+        nodes.add(transition[side])
+
+    nodes = sorted(nodes)
+
+    if len(nodes) == 0:
+      return
+
+    self.cluster_nodes[cluster] = nodes
+    distances = self._clusterDistances(nodes, nodes)
+
+    for i, node in enumerate(nodes):
+
+      for j in range(i + 1, len(nodes)):
+        distance = distances[i][j]
+
+        if distance >= 0:
+          edges.setdefault(node, {})[nodes[j]] = distance
+          edges.setdefault(nodes[j], {})[node] = distance
+
+  def _unlink(self, node: int, neighbor: int) -> None:
+    """
+    Removes an abstract edge, and the nodes it leaves without edges.
+
+    @param node: The flat index of the first node
+    @param neighbor: The flat index of the second node
+    """
+
+    edges = self.edges
+
+    for a, b in ((node, neighbor), (neighbor, node)):
+      node_edges = edges.get(a)
+
+      if node_edges is not None:
+        node_edges.pop(b, None)
+
+        if len(node_edges) == 0:
+          del edges[a]
+
+  def _clusterLinks(self, index: int, other_index: int) -> dict:
+    """
+    Finds the distances from a cell to the nodes of its cluster, and to
+    another cell if it is in the same cluster.
+
+    @param index: The flat index of the cell
+    @param other_index: The flat index of the other cell
+    @return: The distance to each reachable node (or the other cell), by flat index
+    """
+
+    cluster = self.clusterOf(index)
+    targets = list(self.cluster_nodes.get(cluster, []))
+
+    if self.clusterOf(other_index) == cluster:
+      targets.append(other_index)
+
+    if len(targets) == 0:
+      return {}
+
+    distances = self._clusterDistances([index], targets)[0]
+
+    return {
+      target: distance
+      for target, distance in zip(targets, distances)
+      if distance >= 0
+    }
+
+  def _clusterDistances(self, sources: list, targets: list) -> list:
+    """
+    Finds the 4-connected distances between cells of the same cluster,
+    without leaving the cluster. In an obstacle-free cluster, they are
+    Manhattan distances; otherwise, a breadth-first wavefront is grown from
+    every source at once until it reaches every target or stops growing.
+
+    @param sources: The flat indices of the source cells
+    @param targets: The flat indices of the target cells
+    @return: The distance from each source to each target, or -1 if it is unreachable
+    """
+
+    width = self.width
+    cluster_x, cluster_y = self.clusterOf(sources[0])
+    source_ys, source_xs = np.divmod(np.array(sources, dtype=np.int64), width)
+    target_ys, target_xs = np.divmod(np.array(targets, dtype=np.int64), width)
+
+    if self.obstacle_free[cluster_y, cluster_x]:
+      return (
+        np.abs(source_xs[:, None] - target_xs)
+        + np.abs(source_ys[:, None] - target_ys)
+      ).tolist()
+
+    distances = self._wavefront(sources, targets)
+    x_min, y_min = cluster_x * self.cluster_size, cluster_y * self.cluster_size
+
+    return distances[:, target_ys - y_min, target_xs - x_min].tolist()
+
+  def _wavefront(self, sources: list, targets: list = None) -> np.ndarray:
+    """
+    Grows a breadth-first wavefront from each source inside its cluster.
+
+    @param sources: The flat indices of the source cells, all in the same cluster
+    @param targets: The flat indices of the cells at which to stop once all are reached (default is None, grow until the wavefronts stop)
+    @return: The distance fields of the sources over the cluster, as a sources x height x width array (-1 where unreachable)
+    """
+
+    width = self.width
+    x_min, y_min, x_max, y_max = self._clusterBounds(*self.clusterOf(sources[0]))
+    height, cluster_width = y_max - y_min, x_max - x_min
+    source_count = len(sources)
+    # The wavefronts grow side by side in one image, a blocked column apart,
+    # so each step is a single dilation
+    free = np.zeros((height, source_count, cluster_width + 1), dtype=np.uint8)
+    free[:, :, :cluster_width] = (
+      self.blocked.reshape(self.height, width)[y_min:y_max, x_min:x_max] == 0
+    )[:, None, :]
+    free = free.reshape(height, -1)
+    source_ys, source_xs = np.divmod(np.array(sources, dtype=np.int64), width)
+    distances = np.full(free.shape, -1, dtype=np.int32)
+    frontier = np.zeros(free.shape, dtype=np.uint8)
+    frontier[
+      source_ys - y_min,
+      np.arange(source_count) * (cluster_width + 1) + source_xs - x_min
+    ] = 1
+    distances[frontier != 0] = 0
+    unreached = free.copy()
+    unreached[frontier != 0] = 0
+    step = 0
+    self.cluster_searches += 1
+
+    if targets is not None:
+      target_ys, target_xs = np.divmod(np.array(targets, dtype=np.int64), width)
+      target_ys = target_ys - y_min
+      target_xs = (
+        np.arange(source_count)[:, None] * (cluster_width + 1) + (target_xs - x_min)
+      )
+
+    while True:
+
+      if targets is not None and (distances[target_ys, target_xs] >= 0).all():
+        break
+
+      frontier = cv2.dilate(frontier, four_connected_kernel) & unreached
+
+      if not frontier.any():
+        break
+
+      step += 1
+      reached = frontier != 0
+      distances[reached] = step
+      unreached[reached] = 0
+
+    return distances.reshape(height, source_count, cluster_width + 1)[:, :, :cluster_width].transpose(1, 0, 2)
+
+  def _refineEdge(self, node: int, next_node: int) -> list:
+    """
+    Finds the cells of an abstract edge inside a cluster.
+
+    @param node: The flat index of the first cell
+    @param next_node: The flat index of the last cell
+    @return: The 4-connected path between the cells, inclusive of both
+    """
+
+    width = self.width
+    y, x = divmod(node, width)
+    next_y, next_x = divmod(next_node, width)
+    cluster_x, cluster_y = self.clusterOf(node)
+
+    if self.obstacle_free[cluster_y, cluster_x]:
+      return manhattanLine((x, y), (next_x, next_y))
+
+    # Walk down the distance field of the first cell from the last cell
+    distances = self._wavefront([node], [next_node])[0]
+    height, cluster_width = distances.shape
+    x_min, y_min = cluster_x * self.cluster_size, cluster_y * self.cluster_size
+    cell_x, cell_y = next_x - x_min, next_y - y_min
+    path = [(next_x, next_y)]
+    distance = distances[cell_y, cell_x]
+
+    while distance > 0:
+
+      for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        neighbor_x = cell_x + dx
+        neighbor_y = cell_y + dy
+
+        if (
+          0 <= neighbor_x < cluster_width
+          and 0 <= neighbor_y < height
+          and distances[neighbor_y, neighbor_x] == distance - 1
+        ):
+          cell_x, cell_y = neighbor_x, neighbor_y
+          break
+
+      distance -= 1
+      path.append((cell_x + x_min, cell_y + y_min))
+
+    path.reverse()
+
+    return path
+
+  def _searchAbstract(
+    self,
+    start_index: int,
+    goal_index: int,
+    start_links: dict,
+    goal_links: dict
+  ) -> list:
+    """
+    Finds the shortest path through the abstract graph with A*, using the
+    Manhattan heuristic.
+
+    @param start_index: The flat index of the start
+    @param goal_index: The flat index of the goal
+    @param start_links: The distances from the start to the nodes of its cluster
+    @param goal_links: The distances from the goal to the nodes of its cluster
+    @return: The flat indices of the nodes from the start to the goal, or an empty list
+    """
+
+    width = self.width
+    edges = self.edges
+    goal_y, goal_x = divmod(goal_index, width)
+    g_cost = { start_index: 0 }
+    parent = { start_index: None }
+    closed = set()
+    open_list = [(0, 0, start_index)]
+    found = False
+
+    while open_list:
+      _, _, node = heapq.heappop(open_list)
+
+      if node in closed:
+        continue
+
+      if node == goal_index:
+        found = True
+        break
+
+      closed.add(node)
+      self.abstract_expansions += 1
+      neighbors = list(edges.get(node, {}).items())
+
+      if node == start_index:
+        neighbors.extend(start_links.items())
+
+      if node in goal_links:
+        neighbors.append((goal_index, goal_links[node]))
+
+      for neighbor, cost in neighbors:
+        new_cost = g_cost[node] + cost
+
+        if neighbor not in closed and new_cost < g_cost.get(neighbor, math.inf):
+          g_cost[neighbor] = new_cost
+          parent[neighbor] = node
+          y, x = divmod(neighbor, width)
+          heuristic = abs(goal_x - x) + abs(goal_y - y)
+          heapq.heappush(open_list, (new_cost + heuristic, heuristic, neighbor))
+
+    if not found:
+      return []
+
+    path = []
+    node = goal_index
+
+    while node is not None:
+      path.append(node)
+      node = parent[node]
+
+    path.reverse()
+
+    return path
+
+def manhattanLine(point1: tuple, point2: tuple) -> list:
+  """
+  Finds a 4-connected path of Manhattan length between two points, stepping
+  along whichever axis lags behind the straight line between them.
+
+  @param point1: The (x, y) coordinates of the first point
+  @param point2: The (x, y) coordinates of the second point
+  @return: The (x, y) cells from the first point to the second, inclusive
+  """
+
+  x, y = point1
+  distance_x = abs(point2[0] - x)
+  distance_y = abs(point2[1] - y)
+  step_x = 1 if point2[0] > x else -1
+  step_y = 1 if point2[1] > y else -1
+  moved_x = 0
+  moved_y = 0
+  path = [(x, y)]
+
+  for _ in range(distance_x + distance_y):
+
+    if moved_y == distance_y or (
+      moved_x < distance_x
+      and (2 * moved_x + 1) * distance_y < (2 * moved_y + 1) * distance_x
+    ):
+      x += step_x
+      moved_x += 1
+    else:
+      y += step_y
+      moved_y += 1
+
+    path.append((x, y))
+
+  return path
+
+def executeHPAStar(
+  map: LayeredMap,
+  planner: HPAStar,
+  start: cv2.typing.Point,
+  goal: cv2.typing.Point,
+  changed_cells: np.ndarray = None,
+  verbose: bool = False
+) -> list:
+  """
+  Run the HPA* search to find a path in the given map, reusing the planner's
+  abstract graph after updating the clusters around the changed cells.
+
+  @param map: The layered map
+  @param planner: The persistent HPA* planner for the map
+  @param start: The start position
+  @param goal: The goal position
+  @param changed_cells: The (x, y) coordinates of cells that changed since the last run (default is None)
+  @param verbose: Whether or not to print verbose output (default is False)
+  @return: The path found by the HPA* algorithm
+  """
+
+  print("Executing HPA* algorithm...")
+
+  start_time = time.perf_counter()
+  abstract_expansions = planner.abstract_expansions
+  cluster_searches = planner.cluster_searches
+  clusters_updated = planner.clusters_updated
+
+  if changed_cells is not None:
+    planner.updateCells(changed_cells)
+
+  path = planner.findPath(start, goal)
+
+  # Record execution time
+  end_time = time.perf_counter()
+  hpa_star_execution_time = end_time - start_time
+  count("hpa_star.abstract_expansions", planner.abstract_expansions - abstract_expansions)
+  count("hpa_star.cluster_searches", planner.cluster_searches - cluster_searches)
+  count("hpa_star.clusters_updated", planner.clusters_updated - clusters_updated)
+
+  if len(path) != 0:
+    print("Path found!")
+
+    if verbose:
+      print("Path length:", len(path))
+
+  else:
+    print("No path found!")
+
+  if verbose:
+    print("Abstract graph:", len(planner.edges), "nodes in", planner.cluster_columns * planner.cluster_rows, "clusters")
+    print("Abstract vertices expanded:", planner.abstract_expansions - abstract_expansions)
+
+    if changed_cells is not None:
+      print("Clusters updated:", planner.clusters_updated - clusters_updated)
+
+  drawInitialPoints(map, start, goal)
+
+  print("HPA* execution time:", round(hpa_star_execution_time, 6), "seconds")
+  print()
+
+  return path
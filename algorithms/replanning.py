@@ -1,51 +1,79 @@
+import random
 import sys
 import time
 
 sys.path.append('./ai_robotics_final_project')
 
-from algorithms.rrt import executeRRT
+from algorithms.rrt import executeRRT, indexPath
+from algorithms.rrt_connect import executeRRTConnect
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.deadline import feasible, isExpired, no_path, timeout
+from utils.metrics import count
+from utils.points import blockedCells
 
 def executeReplanning(
-  map: list,
+  map: LayeredMap,
+  grid: OccupancyGrid,
   path: list,
   threshold,
   max_iterations,
   step_size,
-  verbose: bool = False
-) -> list:
+  verbose: bool = False,
+  rng: random.Random = None,
+  goal_bias: float = 0.0,
+  robot_radius: float = 0,
+  rrt_planner: str = "rrt",
+  deadline: float = None
+) -> tuple:
   """
   Execute the replanning algorithm by combining the D* and RRT algorithms.
 
-  @param map: The map image with obstacles
+  @param map: The layered map
+  @param grid: The occupancy grid of the map
   @param path: The path found by the D* algorithm
   @param threshold: The maximum number of obstacles to encounter before rerunning D*
   @param max_iterations: Maximum number of iterations for the RRT algorithm
   @param step_size: The step size for tree expansion
   @param verbose: Whether or not to print verbose output (default is False)
-  @return: The final path found by the replanning algorithm
+  @param rng: The random number generator (default is the global random module)
+  @param goal_bias: The probability of the RRT sampling a point of the unvisited path (default is 0.0)
+  @param robot_radius: The radius of the robot, in pixels; path points closer than this to an obstacle are treated as blocked (default is 0, a point robot)
+  @param rrt_planner: The planner of the detours ("rrt" for RRT, "connect" for RRT-Connect; default is "rrt")
+  @param deadline: The time.time() at which replanning gives up; the detours share it (default is None, no deadline)
+  @return: The final path found by the replanning algorithm, and its status ("feasible", "timeout" or "no_path")
   """
 
   print("Executing RRT replanning algorithm...")
 
-  # Obstacle color
-  obstacle_color = "[0 0 0]"
   num_obstacles_encountered = 0
-  # Traversing the path in reverse order
-  unvisited_d_star_path = path.copy()
-  unvisited_d_star_path.reverse()
+  # Traversing the path in reverse order. The unvisited part of the path is
+  # everything from the cursor on, so advancing is an index increment
+  unvisited_d_star_path = path[::-1]
+  cursor = 0
+  # Position of each point in the path, to find where a detour rejoins it
+  path_positions = {
+    point: path_position
+    for path_position, point in enumerate(unvisited_d_star_path)
+  }
+  path_index = None
+  # Cells the robot does not fit on; kept up to date as obstacles are added
+  blocked = blockedCells(grid, robot_radius)
   # Start becomes the goal
   goal = unvisited_d_star_path[-1]
 
   if threshold <= 1:
     threshold = 1
   
-  start_time = time.time()
-  current = unvisited_d_star_path.pop(0)
+  start_time = time.perf_counter()
+  current = unvisited_d_star_path[cursor]
+  cursor += 1
   visited = [current]
 
   # Iterate through the path
-  while len(unvisited_d_star_path) != 0:
-    next = unvisited_d_star_path.pop(0)
+  while cursor < len(unvisited_d_star_path):
+    next = unvisited_d_star_path[cursor]
+    cursor += 1
 
     if next == goal:
       visited.append(next)
@@ -57,29 +85,65 @@ def executeReplanning(
       
       break
 
-    if str(map[(next[1], next[0])]) == obstacle_color:
+    if blocked[next[1] * grid.width + next[0]]:
 
       if verbose:
         print(f"Obstacle detected at: ({next[0]}, {next[1]})")
       
       num_obstacles_encountered += 1
-      # Use RRT to get around the obstacle
-      replanned_path = executeRRT(
-        map,
-        visited,
-        unvisited_d_star_path,
-        max_iterations,
-        step_size,
-        verbose
-      )
-
-      if len(replanned_path) != 0:
-        visited.extend(replanned_path)
-        # Set last visited node as current
+
+      if rrt_planner == "connect":
+        # Grow trees from the current point and from the unvisited path
+        detour, _ = executeRRTConnect(
+          map,
+          grid,
+          [current],
+          unvisited_d_star_path,
+          max_iterations,
+          step_size,
+          verbose,
+          rng=rng,
+          goal_bias=goal_bias,
+          path_start=cursor,
+          robot_radius=robot_radius,
+          deadline=deadline
+        )
+      else:
+
+        # Index the free path points once; the RRT skips the visited ones
+        if path_index is None:
+          path_index = indexPath(
+            grid,
+            unvisited_d_star_path,
+            step_size,
+            cursor,
+            robot_radius
+          )
+
+        # Use RRT to get around the obstacle, from the current point back to
+        # the unvisited path
+        detour, _ = executeRRT(
+          map,
+          grid,
+          [current],
+          unvisited_d_star_path,
+          max_iterations,
+          step_size,
+          verbose,
+          rng=rng,
+          goal_bias=goal_bias,
+          path_index=path_index,
+          path_start=cursor,
+          robot_radius=robot_radius,
+          deadline=deadline
+        )
+
+      if len(detour) != 0:
+        # The detour starts at the current point and ends where it rejoins
+        visited.extend(detour[1:])
+        # Set last visited node as current, and continue after it
         current = visited[-1]
-        unvisited_d_star_path = unvisited_d_star_path[
-          unvisited_d_star_path.index(current) + 1:
-        ]
+        cursor = path_positions[current] + 1
       else:
         # No path found
         break
@@ -91,10 +155,11 @@ def executeReplanning(
   # Reconstruct path
   replanned_path = visited
 
-  if goal in replanned_path:
-    end_time = time.time()
+  if replanned_path[-1] == goal:
+    end_time = time.perf_counter()
     replanning_execution_time = end_time - start_time
     replanned_path.reverse()
+    status = feasible
 
     print("Alternative path found!")
 
@@ -103,13 +168,19 @@ def executeReplanning(
     
   else:
     # Record execution time
-    end_time = time.time()
+    end_time = time.perf_counter()
     replanning_execution_time = end_time - start_time
     replanned_path = []
+    status = timeout if isExpired(deadline) else no_path
 
     print("No path found!")
 
+  count("replanning.obstacles_encountered", num_obstacles_encountered)
+
+  if verbose:
+    print("Planner status:", status)
+
   print("RRT replanning execution time:", round(replanning_execution_time, 6), "seconds")
   print()
 
-  return replanned_path
+  return replanned_path, status
@@ -1,4 +1,4 @@
-import cv2
+import math
 import numpy as np
 import random
 import sys
@@ -6,120 +6,186 @@ import time
 
 sys.path.append('./ai_robotics_final_project')
 
-from utils.points import isCollisionFree
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.deadline import feasible, isExpired, no_path, timeout
+from utils.metrics import count
+from utils.points import areCollisionFree, blockedCells, isCollisionFree
+from utils.profiling import snapshotMemory
+from utils.rrt_tree import RRTTree
+from utils.spatial_index import BucketGrid
+
+# Number of shortcut candidates drawn and checked for collisions together
+shortcut_batch_size = 16
 
 def executeRRT(
-  map: list,
+  map: LayeredMap,
+  grid: OccupancyGrid,
   visited_path: list,
   unvisited_path: list,
   max_iterations: int = 1000,
   step_size: int = 10,
-  verbose=False
-) -> list:
+  verbose=False,
+  tree_index=None,
+  rng: random.Random = None,
+  goal_bias: float = 0.0,
+  path_index=None,
+  path_start: int = 0,
+  robot_radius: float = 0,
+  deadline: float = None,
+  anytime: bool = False
+) -> tuple:
   """
-  Implements the Rapidly-Exploring Random Tree (RRT) algorithm.
+  Implements the Rapidly-Exploring Random Tree (RRT) algorithm. The tree is
+  an RRTTree, so its memory grows by a few bytes per node and large
+  max_iterations fit in memory.
 
-  @param map: The map image with obstacles
+  @param map: The layered map to draw the tree and path on
+  @param grid: The occupancy grid of the map
   @param visited_path: The visited path
   @param unvisited_path: The unvisited path
   @param max_iterations: Maximum number of iterations for the RRT algorithm (default is 1000)
   @param step_size: The step size for tree expansion (default is 10)
   @param verbose: Whether or not to print verbose output (default is False)
-  @return: The path found by the RRT algorithm
+  @param tree_index: An empty nearest-neighbor index for the tree nodes, with their numbers as values (default is a BucketGrid)
+  @param rng: The random number generator (default is the global random module)
+  @param goal_bias: The probability of sampling a point of the unvisited path instead of free space (default is 0.0)
+  @param path_index: The free points of unvisited_path, indexed by their position in it with indexPath() (default is built here)
+  @param path_start: The position of the first unvisited point in unvisited_path; earlier points are ignored (default is 0)
+  @param robot_radius: The radius of the robot, in pixels; edges keep this clearance from obstacles (default is 0, a point robot)
+  @param deadline: The time.time() at which the search gives up (default is None, no deadline)
+  @param anytime: Whether or not to shorten the path found until the deadline, with shortcutPath() (default is False)
+  @return: The path found by the RRT algorithm, and its status ("feasible", "timeout" or "no_path")
   """
 
   print("Executing RRT algorithm...")
 
-  goal: tuple = None
-  obstacle_color = "[0 0 0]"
+  goal: int = None
   rrt_execution_time = 0
-  rows, cols, rgb = map.shape
+  rows, cols = grid.height, grid.width
   # Get the start point for the RRT path
   start = visited_path.pop()
-  rrt_visited = [ (start[0], start[1]) ]
-  parent = { (start[0], start[1]): None }
-  start_time = time.time()
+  # Each iteration adds at most a node and a reached path point
+  tree = RRTTree(cols, rows, max_iterations + 2)
+
+  if rng is None:
+    rng = random
+
+  if tree_index is None:
+    tree_index = BucketGrid(cols, rows, step_size * 4)
 
-  # TODO: Make more memory efficient, so we can increase max_iterations
+  tree_index.insert(start, tree.insert(start))
+  start_time = time.perf_counter()
+  samples = 0
+  samples_rejected = 0
+  collision_checks = 0
+
+  if path_index is None:
+    path_index = indexPath(
+      grid,
+      unvisited_path,
+      step_size,
+      path_start,
+      robot_radius
+    )
+
+  # Samples are only drawn from free space (or the unvisited path, when
+  # biased), so no iterations are spent steering into obstacles
+  sampler = grid.freeSpaceSampler()
 
   for i in range(max_iterations):
-    # Random point in map
-    rand_point = (random.randint(0, cols - 1), random.randint(0, rows - 1))
+
+    if isExpired(deadline):
+      break
+
+    # Random free point in map
+    rand_point = sampler.sample(rng, unvisited_path, goal_bias, path_start)
+
+    if rand_point is None:
+      break
+
+    samples += 1
     # Find nearest node
-    nearest_node = min(
-      rrt_visited,
-      key=lambda node: np.linalg.norm(np.array(node) - np.array(rand_point))
-    )
+    nearest = tree_index.nearest(rand_point)
+    nearest_node = tree.point(nearest)
     # Steer towards the random point
-    direction = np.array(rand_point) - np.array(nearest_node)
-    length = np.linalg.norm(direction)
+    dx = rand_point[0] - nearest_node[0]
+    dy = rand_point[1] - nearest_node[1]
+    length = math.hypot(dx, dy)
 
     if length == 0:
+      samples_rejected += 1
       continue
 
-    direction = direction / length
-    new_point = tuple(
-      (np.array(nearest_node) + step_size * direction).astype(int)
+    new_point = (
+      int(nearest_node[0] + step_size * (dx / length)),
+      int(nearest_node[1] + step_size * (dy / length))
     )
 
-    # Check collision
-    if (
+    # A point already in the tree keeps its parent, so the tree cannot form a
+    # cycle
+    accepted = (
       0 <= new_point[0] < cols
       and 0 <= new_point[1] < rows
-      and isCollisionFree(map, nearest_node, new_point, step_size)
-    ):
-      rrt_visited.append(new_point)
-      parent[new_point] = nearest_node
+      and tree.find(new_point) < 0
+    )
+
+    # Check collision
+    if accepted:
+      collision_checks += 1
+      accepted = isCollisionFree(grid, nearest_node, new_point, robot_radius)
+
+    if not accepted:
+      samples_rejected += 1
+    else:
+      new_node = tree.insert(new_point, nearest)
+      tree_index.insert(new_point, new_node)
       # Draw on map for visualization
-      cv2.line(map, nearest_node, new_point, (0, 155, 255), 1) # Orange
-
-      for unvisited_point in unvisited_path:
-        
-        # If unvisited_point is not an obstacle
-        if str(map[(unvisited_point[1], unvisited_point[0])]) != obstacle_color:
-          distance = np.linalg.norm(
-            np.array(new_point) - np.array(unvisited_point)
-          )
-          
-          # Check if a goal point is reached
-          if distance < step_size:
-            # Draw final 
-            cv2.line(map, new_point, unvisited_point, (255, 155, 0), 1) # Light Blue
-            parent[unvisited_point] = new_point
-            # Record execution time
-            end_time = time.time()
-            rrt_execution_time = end_time - start_time
-            goal = unvisited_point
-
-            if verbose:
-              print(f"Goal point ({str(goal[0])}, {str(goal[1])}) reached in {i} iterations!")
-
-            break
+      map.drawLine("rrt_tree", nearest_node, new_point, (0, 155, 255)) # Orange
+
+      # Find the free unvisited path points within reach of the new node
+      path_positions = [
+        path_position
+        for path_position in path_index.withinRadius(new_point, step_size)
+        if path_position >= path_start
+      ]
+
+      # Check if a goal point is reached, preferring the earliest one in the path
+      if len(path_positions) != 0:
+        unvisited_point = unvisited_path[min(path_positions)]
+
+        # A path point that is already in the tree is reached through it
+        goal = tree.find(unvisited_point)
+
+        if goal < 0:
+          goal = tree.insert(unvisited_point, new_node)
+
+        # Record execution time
+        end_time = time.perf_counter()
+        rrt_execution_time = end_time - start_time
+
+        if verbose:
+          print(f"Goal point ({str(unvisited_point[0])}, {str(unvisited_point[1])}) reached in {i} iterations!")
     
-    if goal:
+    if goal is not None:
       break
   
+  # The tree is at its largest before it is freed on return
+  snapshotMemory("end of RRT search")
   path = []
 
-  if goal:
-    # Backtrack to get the path to goal point
-    rrt_visited = [goal]
-    current = parent.pop(goal, parent[goal])
-    cv2.line(map, goal, current, (255, 155, 0), 1) # Light Blue
-
-    while current is not None:
-      rrt_visited.append(current)
-      next = parent.pop(current, None)
-      
-      if next is not None:
-        cv2.line(map, current, next, (255, 155, 0), 1) # Light Blue
-        current = next
-      elif current == start:
-        current = None
-
-    rrt_visited.reverse()
+  if goal is not None:
+    # Backtrack from the goal point to the start
+    rrt_visited = tree.path(goal)
+
+    if anytime:
+      rrt_visited = shortcutPath(grid, rrt_visited, deadline, rng, robot_radius)
+      rrt_execution_time = time.perf_counter() - start_time
+
+    drawPath(map, rrt_visited)
     visited_path.extend(rrt_visited)
     path = visited_path
+    status = feasible
 
     print("Alternative path found!")
 
@@ -128,13 +194,128 @@ def executeRRT(
     
   else:
     # Record execution time
-    end_time = time.time()
+    end_time = time.perf_counter()
     rrt_execution_time = end_time - start_time
     path = []
+    status = timeout if isExpired(deadline) else no_path
 
     print("No path found!")
 
+  count("rrt.samples", samples)
+  count("rrt.samples_rejected", samples_rejected)
+  count("rrt.collision_checks", collision_checks)
+  count("rrt.nearest_queries", samples)
+
+  if verbose:
+    print("Planner status:", status)
+
   print("RRT execution time:", round(rrt_execution_time, 6), "seconds")
   print()
   
+  return path, status
+
+def shortcutPath(
+  grid: OccupancyGrid,
+  path: list,
+  deadline: float = None,
+  rng: random.Random = None,
+  robot_radius: float = 0,
+  max_failures: int = 100
+) -> list:
+  """
+  Shortens a path by joining random pairs of its points with a straight
+  line wherever the line is collision free, dropping the points between
+  them. The path keeps its first and last points. Shortcuts are drawn in
+  batches that are checked together with areCollisionFree(); the free ones
+  that drop the most points are applied first, skipping any that overlap one
+  already applied. Shortcuts are tried until the deadline passes or
+  max_failures tries in a row fail, so the path improves for as long as the
+  time budget allows.
+
+  @param grid: The occupancy grid of the map
+  @param path: The (x, y) points of the path
+  @param deadline: The time.time() at which shortcutting stops (default is None, only stop after max_failures)
+  @param rng: The random number generator (default is the global random module)
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @param max_failures: The number of failed tries in a row after which the path is kept (default is 100)
+  @return: The shortened path
+  """
+
+  if rng is None:
+    rng = random
+
+  failures = 0
+  collision_checks = 0
+
+  while len(path) > 2 and failures < max_failures and not isExpired(deadline):
+    tries = min(shortcut_batch_size, max_failures - failures)
+    firsts = [rng.randrange(len(path) - 2) for _ in range(tries)]
+    lasts = [rng.randrange(first + 2, len(path)) for first in firsts]
+    points = np.asarray(path)
+    free = areCollisionFree(grid, points[firsts], points[lasts], robot_radius)
+    collision_checks += tries
+
+    if not free.any():
+      failures += tries
+      continue
+
+    keep = np.ones(len(path), dtype=bool)
+    applied = []
+
+    # Longest shortcuts first
+    for candidate in sorted(np.flatnonzero(free), key=lambda c: firsts[c] - lasts[c]):
+      first, last = firsts[candidate], lasts[candidate]
+
+      if all(last <= other_first or first >= other_last for other_first, other_last in applied):
+        keep[first + 1:last] = False
+        applied.append((first, last))
+
+    path = [point for point, kept in zip(path, keep) if kept]
+    failures = 0
+
+  count("shortcut.collision_checks", collision_checks)
+
   return path
+
+def drawPath(map: LayeredMap, path: list) -> None:
+  """
+  Draws a path found by an RRT planner on the RRT path layer.
+
+  @param map: The layered map to draw the path on
+  @param path: The (x, y) points of the path
+  """
+
+  for point1, point2 in zip(path, path[1:]):
+    map.drawLine("rrt_path", point1, point2, (255, 155, 0)) # Light Blue
+
+def indexPath(
+  grid: OccupancyGrid,
+  path: list,
+  step_size: int,
+  path_start: int = 0,
+  robot_radius: float = 0
+) -> BucketGrid:
+  """
+  Indexes the free points of a path by their position in the path, so
+  connecting back to it is a lookup around each new node instead of a scan
+  over the whole path.
+
+  @param grid: The occupancy grid of the map
+  @param path: The path to index
+  @param step_size: The step size for tree expansion
+  @param path_start: The position of the first point to index (default is 0)
+  @param robot_radius: The radius of the robot, in pixels; only points the robot fits on are indexed (default is 0, a point robot)
+  @return: The bucket grid of the free path points, with their positions as values
+  """
+
+  path_index = BucketGrid(grid.width, grid.height, step_size)
+  blocked = blockedCells(grid, robot_radius)
+  width = grid.width
+
+  for path_position in range(path_start, len(path)):
+    point = path[path_position]
+
+    if not blocked[point[1] * width + point[0]]:
+      path_index.insert(point, path_position)
+
+  return path_index
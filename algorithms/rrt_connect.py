@@ -0,0 +1,246 @@
+import math
+import random
+import sys
+import time
+
+sys.path.append('./ai_robotics_final_project')
+
+from algorithms.rrt import drawPath, shortcutPath
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.deadline import feasible, isExpired, no_path, timeout
+from utils.metrics import count
+from utils.points import blockedCells, isCollisionFree
+from utils.profiling import snapshotMemory
+from utils.rrt_tree import RRTTree
+from utils.spatial_index import BucketGrid
+
+def executeRRTConnect(
+  map: LayeredMap,
+  grid: OccupancyGrid,
+  visited_path: list,
+  unvisited_path: list,
+  max_iterations: int = 1000,
+  step_size: int = 10,
+  verbose=False,
+  rng: random.Random = None,
+  goal_bias: float = 0.0,
+  path_start: int = 0,
+  robot_radius: float = 0,
+  deadline: float = None,
+  anytime: bool = False
+) -> tuple:
+  """
+  Implements the bidirectional RRT-Connect algorithm. One tree grows from the
+  start, the other from the free points of the unvisited path (the goal, or
+  every point a detour can rejoin the path at). Each iteration extends one
+  tree a step towards a random sample, then greedily extends the other tree
+  towards the new node until it is reached or blocked, and the trees swap
+  roles. The trees meet far sooner than a single tree wanders within a step
+  of its target, so fewer iterations are needed on cluttered maps.
+
+  @param map: The layered map to draw the trees and path on
+  @param grid: The occupancy grid of the map
+  @param visited_path: The visited path
+  @param unvisited_path: The unvisited path
+  @param max_iterations: Maximum number of iterations for the RRT-Connect algorithm (default is 1000)
+  @param step_size: The step size for tree expansion (default is 10)
+  @param verbose: Whether or not to print verbose output (default is False)
+  @param rng: The random number generator (default is the global random module)
+  @param goal_bias: The probability of sampling a point of the unvisited path instead of free space (default is 0.0)
+  @param path_start: The position of the first unvisited point in unvisited_path; earlier points are ignored (default is 0)
+  @param robot_radius: The radius of the robot, in pixels; edges keep this clearance from obstacles (default is 0, a point robot)
+  @param deadline: The time.time() at which the search gives up (default is None, no deadline)
+  @param anytime: Whether or not to shorten the path found until the deadline, with shortcutPath() (default is False)
+  @return: The path found by the RRT-Connect algorithm, and its status ("feasible", "timeout" or "no_path")
+  """
+
+  print("Executing RRT-Connect algorithm...")
+
+  meeting_point: tuple = None
+  rrt_execution_time = 0
+  rows, cols = grid.height, grid.width
+  # Get the start point for the RRT path
+  start = visited_path.pop()
+  start_tree = RRTTree(cols, rows, max_iterations + 1)
+  start_index = BucketGrid(cols, rows, step_size * 4)
+  start_index.insert(start, start_tree.insert(start))
+  # The goal tree has a root at every free unvisited path point
+  goal_tree = RRTTree(cols, rows, max_iterations + len(unvisited_path) - path_start)
+  goal_index = BucketGrid(cols, rows, step_size * 4)
+  blocked = blockedCells(grid, robot_radius)
+
+  for path_position in range(path_start, len(unvisited_path)):
+    point = unvisited_path[path_position]
+
+    if not blocked[point[1] * cols + point[0]] and goal_tree.find(point) < 0:
+      goal_index.insert(point, goal_tree.insert(point))
+
+  if rng is None:
+    rng = random
+
+  start_time = time.perf_counter()
+  samples = 0
+  samples_rejected = 0
+  # Samples are only drawn from free space (or the unvisited path, when biased)
+  sampler = grid.freeSpaceSampler()
+  # The tree that is extended towards the next sample comes first
+  trees = [(start_tree, start_index), (goal_tree, goal_index)]
+
+  for i in range(max_iterations):
+
+    if len(goal_tree) == 0 or isExpired(deadline):
+      break
+
+    # Random free point in map
+    rand_point = sampler.sample(rng, unvisited_path, goal_bias, path_start)
+
+    if rand_point is None:
+      break
+
+    samples += 1
+    (tree, tree_index), (other_tree, other_index) = trees
+    new_point = extendTree(
+      map,
+      grid,
+      tree,
+      tree_index,
+      rand_point,
+      step_size,
+      robot_radius
+    )
+
+    if new_point is None:
+      samples_rejected += 1
+
+    # Connect: extend the other tree towards the new node until it is reached
+    while new_point is not None:
+
+      if other_tree.find(new_point) >= 0:
+        meeting_point = new_point
+        break
+
+      if extendTree(
+        map,
+        grid,
+        other_tree,
+        other_index,
+        new_point,
+        step_size,
+        robot_radius
+      ) is None:
+        break
+
+    if meeting_point:
+      # Record execution time
+      end_time = time.perf_counter()
+      rrt_execution_time = end_time - start_time
+
+      if verbose:
+        print(f"Trees connected at ({str(meeting_point[0])}, {str(meeting_point[1])}) in {i} iterations!")
+
+      break
+
+    trees.reverse()
+
+  snapshotMemory("end of RRT-Connect search")
+  path = []
+
+  if meeting_point:
+    # Backtrack from the meeting point to the start, then to a goal tree root
+    rrt_visited = start_tree.path(start_tree.find(meeting_point))
+    goal_branch = goal_tree.path(goal_tree.find(meeting_point))
+    rrt_visited.extend(reversed(goal_branch[:-1]))
+
+    if anytime:
+      rrt_visited = shortcutPath(grid, rrt_visited, deadline, rng, robot_radius)
+      rrt_execution_time = time.perf_counter() - start_time
+
+    drawPath(map, rrt_visited)
+    visited_path.extend(rrt_visited)
+    path = visited_path
+    status = feasible
+
+    print("Alternative path found!")
+
+    if verbose:
+      print("Path length:", len(visited_path))
+
+  else:
+    # Record execution time
+    end_time = time.perf_counter()
+    rrt_execution_time = end_time - start_time
+    status = timeout if isExpired(deadline) else no_path
+
+    print("No path found!")
+
+  count("rrt_connect.samples", samples)
+  count("rrt_connect.samples_rejected", samples_rejected)
+
+  if verbose:
+    print("Planner status:", status)
+
+  print("RRT-Connect execution time:", round(rrt_execution_time, 6), "seconds")
+  print()
+
+  return path, status
+
+def extendTree(
+  map: LayeredMap,
+  grid: OccupancyGrid,
+  tree: RRTTree,
+  tree_index: BucketGrid,
+  target: tuple,
+  step_size: int,
+  robot_radius: float = 0
+) -> tuple:
+  """
+  Extends a tree from its node nearest to a target, by one step towards it
+  or onto it when it is within a step.
+
+  @param map: The layered map to draw the new edge on
+  @param grid: The occupancy grid of the map
+  @param tree: The tree
+  @param tree_index: The nearest-neighbor index of the nodes of the tree, with their numbers as values
+  @param target: The (x, y) point to extend towards
+  @param step_size: The step size for tree expansion
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @return: The new node, or None if the step is blocked or already in the tree
+  """
+
+  nearest = tree_index.nearest(target)
+  nearest_node = tree.point(nearest)
+  count("rrt_connect.nearest_queries")
+  dx = target[0] - nearest_node[0]
+  dy = target[1] - nearest_node[1]
+  length = math.hypot(dx, dy)
+
+  if length == 0:
+    return None
+
+  if length <= step_size:
+    new_point = (int(target[0]), int(target[1]))
+  else:
+    new_point = (
+      int(nearest_node[0] + step_size * dx / length),
+      int(nearest_node[1] + step_size * dy / length)
+    )
+
+  # A point already in the tree keeps its parent, so the tree cannot form a
+  # cycle
+  if (
+    not (0 <= new_point[0] < grid.width and 0 <= new_point[1] < grid.height)
+    or tree.find(new_point) >= 0
+  ):
+    return None
+
+  count("rrt_connect.collision_checks")
+
+  if not isCollisionFree(grid, nearest_node, new_point, robot_radius):
+    return None
+
+  tree_index.insert(new_point, tree.insert(new_point, nearest))
+  # Draw on map for visualization
+  map.drawLine("rrt_tree", nearest_node, new_point, (0, 155, 255)) # Orange
+
+  return new_point
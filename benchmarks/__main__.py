@@ -0,0 +1,47 @@
+import datetime
+import sys
+
+sys.path.append('./ai_robotics_final_project')
+
+from benchmarks.benchmark import (
+  compareResults,
+  loadResults,
+  runBenchmarks,
+  writeResults
+)
+from utils.args import parseBenchmarkArgs
+
+# See README.md for instructions on how to run the benchmarks.
+
+def main() -> None:
+  args = parseBenchmarkArgs()
+
+  if args.command == "run":
+    output_path = args.output
+
+    if output_path is None:
+      timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+      output_path = f"./ai_robotics_final_project/benchmarks/results/benchmark_{timestamp}"
+
+    results = runBenchmarks(
+      args.scenario_set,
+      args.warmup,
+      args.repeats,
+      args.d_star_planner,
+      args.rrt_planner,
+      args.cluster_size
+    )
+    writeResults(results, output_path)
+
+  else:
+    regressions = compareResults(
+      loadResults(args.baseline),
+      loadResults(args.candidate),
+      args.threshold
+    )
+
+    if len(regressions) != 0:
+      sys.exit(1)
+
+if __name__ == "__main__":
+  main()
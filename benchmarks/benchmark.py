@@ -0,0 +1,417 @@
+import contextlib
+import csv
+import cv2
+import datetime
+import gc
+import io
+import json
+import numpy as np
+import os
+import platform
+import statistics
+import sys
+import time
+
+sys.path.append('./ai_robotics_final_project')
+
+from algorithms.d_star_lite import DStarLite
+from algorithms.hpa_star import HPAStar
+from algorithms.grid_search import searchPath
+from algorithms.replanning import executeReplanning
+from algorithms.rrt import executeRRT
+from algorithms.rrt_connect import executeRRTConnect
+from benchmarks.scenarios import getScenarios
+from maps.generate_maps import (
+  configureImageOutput,
+  generateDynamicObstacle,
+  generateMap
+)
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.points import (
+  clearPaths,
+  drawPathPoints,
+  expandPath,
+  pathCost,
+  selectInitialPoints
+)
+from utils.rng import createRng
+
+# Timed stages, in the order they run
+stages = (
+  "map_generation",
+  "d_star",
+  "rrt",
+  "dynamic_obstacles",
+  "replanning"
+)
+csv_columns = (
+  "scenario",
+  "map_size",
+  "num_initial_obstacles",
+  "rrt_max_iterations",
+  "rrt_step_size",
+  "seed",
+  "stage",
+  "repeats",
+  "min",
+  "median",
+  "mean",
+  "stdev"
+)
+
+def runBenchmarks(
+  scenario_set: str = "standard",
+  warmup: int = 1,
+  repeats: int = 5,
+  d_star_planner: str = "4",
+  rrt_planner: str = "rrt",
+  cluster_size: int = 32
+) -> dict:
+  """
+  Runs every scenario of a scenario set and collects the timings of each stage.
+
+  @param scenario_set: The name of the scenario set (default is "standard")
+  @param warmup: The number of untimed runs before the timed runs (default is 1)
+  @param repeats: The number of timed runs of each scenario (default is 5)
+  @param d_star_planner: The D* planner of the d_star stage ("lite", "hpa", "4", "8" or "theta"; default is "4")
+  @param rrt_planner: The RRT planner of the rrt and replanning stages ("rrt" or "connect"; default is "rrt")
+  @param cluster_size: The length and width of the HPA* clusters, in pixels (default is 32)
+  @return: The benchmark results, with the metadata of the run
+  """
+
+  # Never open windows or save images while benchmarking
+  configureImageOutput(True, "none", 0)
+
+  scenarios = getScenarios(scenario_set)
+  results = []
+
+  print(f"Running {len(scenarios)} benchmark scenarios ({warmup} warmup, {repeats} repeats, D* planner {d_star_planner}, RRT planner {rrt_planner})...")
+
+  for scenario in scenarios:
+    result = runScenario(
+      scenario,
+      warmup,
+      repeats,
+      d_star_planner,
+      rrt_planner,
+      cluster_size
+    )
+    results.append(result)
+
+    print(f"{scenario['name']}:")
+
+    for stage, timing in result["stages"].items():
+      print(f"  {stage}: median {round(timing['median'], 6)} seconds")
+
+  print("Benchmarks completed successfully!")
+  print()
+
+  return {
+    "metadata": {
+      "created": datetime.datetime.now().isoformat(timespec="seconds"),
+      "python": platform.python_version(),
+      "numpy": np.__version__,
+      "opencv": cv2.__version__,
+      "platform": platform.platform(),
+      "processor": platform.processor(),
+      "scenario_set": scenario_set,
+      "d_star_planner": d_star_planner,
+      "rrt_planner": rrt_planner,
+      "cluster_size": cluster_size,
+      "warmup": warmup,
+      "repeats": repeats
+    },
+    "results": results
+  }
+
+def runScenario(
+  scenario: dict,
+  warmup: int,
+  repeats: int,
+  d_star_planner: str = "4",
+  rrt_planner: str = "rrt",
+  cluster_size: int = 32
+) -> dict:
+  """
+  Runs a scenario repeatedly and summarizes the timings of each stage.
+
+  @param scenario: The scenario to run
+  @param warmup: The number of untimed runs before the timed runs
+  @param repeats: The number of timed runs
+  @param d_star_planner: The D* planner of the d_star stage (default is "4")
+  @param rrt_planner: The RRT planner of the rrt and replanning stages (default is "rrt")
+  @param cluster_size: The length and width of the HPA* clusters, in pixels (default is 32)
+  @return: The scenario, the outcome of its last run and its stage timings
+  """
+
+  stage_timings = {}
+  outcome = {}
+
+  for run in range(warmup + repeats):
+    gc.collect()
+    timings, outcome = runScenarioOnce(
+      scenario,
+      d_star_planner,
+      rrt_planner,
+      cluster_size
+    )
+
+    if run < warmup:
+      continue
+
+    for stage, seconds in timings.items():
+      stage_timings.setdefault(stage, []).append(seconds)
+
+  return {
+    "scenario": scenario,
+    "outcome": outcome,
+    "stages": {
+      stage: summarizeTimings(stage_timings[stage])
+      for stage in stages
+      if stage in stage_timings
+    }
+  }
+
+def runScenarioOnce(
+  scenario: dict,
+  d_star_planner: str = "4",
+  rrt_planner: str = "rrt",
+  cluster_size: int = 32
+) -> tuple:
+  """
+  Runs each stage of a scenario once. Every stage draws from its own random
+  stream, derived from the scenario seed, so each run does exactly the same
+  work. Stages that need a D* path are skipped when there is none.
+
+  @param scenario: The scenario to run
+  @param d_star_planner: The D* planner of the d_star stage (default is "4")
+  @param rrt_planner: The RRT planner of the rrt and replanning stages (default is "rrt")
+  @param cluster_size: The length and width of the HPA* clusters, in pixels (default is 32)
+  @return: The seconds taken by each stage, and the paths found and cells expanded
+  """
+
+  seed = scenario["seed"]
+  timings = {}
+  outcome = {}
+
+  # The planners report their progress on stdout; keep the benchmark output clean
+  with contextlib.redirect_stdout(io.StringIO()):
+    rng = createRng(seed, "map_generation")
+    start_time = time.perf_counter()
+    map = generateMap(scenario["map_size"], scenario["num_initial_obstacles"], rng)
+    timings["map_generation"] = time.perf_counter() - start_time
+
+    map = LayeredMap(map)
+    grid = OccupancyGrid(map.base)
+    start, goal = selectInitialPoints(grid, rng=createRng(seed, "initial_points"))
+
+    start_time = time.perf_counter()
+
+    if d_star_planner == "lite":
+      d_star_lite = DStarLite(grid, start, goal)
+      d_star_path = []
+
+      if grid.areConnected(start, goal) and d_star_lite.computeShortestPath():
+        d_star_path = d_star_lite.extractPath()
+
+      expansions = d_star_lite.expansions
+    elif d_star_planner == "hpa":
+      # The abstract graph is built in the timed stage; HPA* expands nodes
+      # of the graph instead of cells
+      hpa_star = HPAStar(grid, cluster_size)
+      d_star_path = hpa_star.findPath(start, goal)
+      expansions = hpa_star.abstract_expansions
+    else:
+      d_star_path, expansions = searchPath(grid, start, goal, d_star_planner)
+
+    timings["d_star"] = time.perf_counter() - start_time
+    outcome["d_star_path_cost"] = round(pathCost(d_star_path), 2)
+    outcome["d_star_expansions"] = expansions
+    # Theta* returns waypoints; the later stages walk the cells of the path
+    d_star_path = [(x, y) for x, y in expandPath(d_star_path).tolist()]
+    outcome["d_star_path_length"] = len(d_star_path)
+
+    if len(d_star_path) == 0:
+      return timings, outcome
+
+    rng = createRng(seed, "rrt")
+    start_time = time.perf_counter()
+    execute = executeRRTConnect if rrt_planner == "connect" else executeRRT
+    rrt_path, _ = execute(
+      map.copy(),
+      grid,
+      [start],
+      [goal],
+      scenario["rrt_max_iterations"],
+      scenario["rrt_step_size"],
+      rng=rng,
+      goal_bias=scenario["rrt_goal_bias"]
+    )
+    timings["rrt"] = time.perf_counter() - start_time
+    outcome["rrt_path_length"] = len(rrt_path)
+
+    # Dynamic obstacles are placed on the drawn D* path
+    dynamic_obstacle_map = map.copy()
+    dynamic_obstacle_grid = OccupancyGrid(dynamic_obstacle_map.base)
+    drawPathPoints(dynamic_obstacle_map, dynamic_obstacle_grid, d_star_path, (0, 0, 255))
+    rng = createRng(seed, "dynamic_obstacles")
+    start_time = time.perf_counter()
+    generateDynamicObstacle(
+      dynamic_obstacle_map,
+      dynamic_obstacle_grid,
+      d_star_path,
+      scenario["num_dynamic_obstacles"],
+      rng=rng
+    )
+    timings["dynamic_obstacles"] = time.perf_counter() - start_time
+
+    clearPaths(dynamic_obstacle_map)
+    rng = createRng(seed, "replanning")
+    start_time = time.perf_counter()
+    replanning_path, _ = executeReplanning(
+      dynamic_obstacle_map,
+      dynamic_obstacle_grid,
+      d_star_path,
+      scenario["replanning_threshold"],
+      scenario["rrt_max_iterations"],
+      scenario["rrt_step_size"],
+      rng=rng,
+      goal_bias=scenario["rrt_goal_bias"],
+      rrt_planner=rrt_planner
+    )
+    timings["replanning"] = time.perf_counter() - start_time
+    outcome["replanning_path_length"] = len(replanning_path)
+
+  return timings, outcome
+
+def summarizeTimings(timings: list) -> dict:
+  """
+  Summarizes the timed runs of a stage.
+
+  @param timings: The seconds taken by each run
+  @return: The number of runs and the min, median, mean and standard deviation, in seconds
+  """
+
+  return {
+    "repeats": len(timings),
+    "min": min(timings),
+    "median": statistics.median(timings),
+    "mean": statistics.mean(timings),
+    "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0
+  }
+
+def writeResults(results: dict, output_path: str) -> None:
+  """
+  Writes benchmark results as JSON (<output_path>.json) and CSV, with one row
+  per scenario and stage (<output_path>.csv).
+
+  @param results: The benchmark results
+  @param output_path: The path of the result files, without an extension
+  """
+
+  output_folder = os.path.dirname(output_path)
+
+  if output_folder != "":
+    os.makedirs(output_folder, exist_ok=True)
+
+  with open(output_path + ".json", "w") as json_file:
+    json.dump(results, json_file, indent=2)
+
+  with open(output_path + ".csv", "w", newline="") as csv_file:
+    writer = csv.writer(csv_file)
+    writer.writerow(csv_columns)
+
+    for result in results["results"]:
+      scenario = result["scenario"]
+
+      for stage, timing in result["stages"].items():
+        writer.writerow(
+          [scenario["name"]]
+          + [scenario[column] for column in csv_columns[1:6]]
+          + [stage]
+          + [timing[column] for column in csv_columns[7:]]
+        )
+
+  print(f"Benchmark results saved to {output_path}.json and {output_path}.csv")
+
+def loadResults(path: str) -> dict:
+  """
+  Loads benchmark results from a JSON result file.
+
+  @param path: The path of the JSON result file
+  @return: The benchmark results
+  """
+
+  with open(path) as json_file:
+    return json.load(json_file)
+
+def compareResults(
+  baseline: dict,
+  candidate: dict,
+  threshold: float = 0.1,
+  min_difference: float = 0.001
+) -> list:
+  """
+  Compares the median stage timings of two benchmark results. A stage has
+  regressed when its candidate median is more than threshold slower than the
+  baseline median, and by more than min_difference seconds.
+
+  @param baseline: The baseline benchmark results
+  @param candidate: The candidate benchmark results
+  @param threshold: The allowed relative slowdown (default is 0.1, i.e. 10%)
+  @param min_difference: The smallest slowdown, in seconds, that counts as a regression (default is 0.001)
+  @return: The (scenario, stage, baseline median, candidate median) of each regression
+  """
+
+  baseline_results = {
+    result["scenario"]["name"]: result for result in baseline["results"]
+  }
+  regressions = []
+
+  for result in candidate["results"]:
+    name = result["scenario"]["name"]
+    baseline_result = baseline_results.get(name)
+
+    if baseline_result is None:
+      print(f"{name}: not in baseline, skipped")
+      continue
+
+    if result["outcome"] != baseline_result["outcome"]:
+      print(f"{name}: outcome changed from {baseline_result['outcome']} to {result['outcome']}")
+
+    for stage, timing in result["stages"].items():
+
+      if stage not in baseline_result["stages"]:
+        continue
+
+      baseline_median = baseline_result["stages"][stage]["median"]
+      candidate_median = timing["median"]
+      change = (
+        (candidate_median - baseline_median) / baseline_median
+        if baseline_median > 0
+        else 0.0
+      )
+      regressed = (
+        candidate_median > baseline_median * (1 + threshold)
+        and candidate_median - baseline_median > min_difference
+      )
+
+      if regressed:
+        regressions.append((name, stage, baseline_median, candidate_median))
+
+      print(
+        f"{name} {stage}: {round(baseline_median, 6)} -> {round(candidate_median, 6)} seconds "
+        f"({change:+.1%}){' REGRESSION' if regressed else ''}"
+      )
+
+  print()
+
+  if len(regressions) != 0:
+    print(f"{len(regressions)} stage(s) regressed by more than {threshold:.0%}.")
+  else:
+    print("No regressions found!")
+
+  print()
+
+  return regressions
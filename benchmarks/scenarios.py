@@ -0,0 +1,73 @@
+import math
+
+def createScenario(
+  map_size: int,
+  obstacle_density: float,
+  rrt_max_iterations: int,
+  rrt_step_size: int,
+  seed: int,
+  rrt_goal_bias: float = 0.05
+) -> dict:
+  """
+  Creates a benchmark scenario. The number of obstacles is derived from the
+  map size, and every random choice of the scenario is drawn from its seed.
+
+  @param map_size: The length and width of the map, in pixels
+  @param obstacle_density: The number of initial obstacles per pixel of map size
+  @param rrt_max_iterations: Maximum number of iterations for the RRT algorithm
+  @param rrt_step_size: The step size for the RRT algorithm
+  @param seed: The seed of the scenario
+  @param rrt_goal_bias: The probability of the RRT sampling the goal (default is 0.05)
+  @return: The scenario
+  """
+
+  num_initial_obstacles = max(math.floor(map_size * obstacle_density), 1)
+
+  return {
+    "name": f"ms{map_size}_nio{num_initial_obstacles}_rmi{rrt_max_iterations}_rss{rrt_step_size}_seed{seed}",
+    "map_size": map_size,
+    "num_initial_obstacles": num_initial_obstacles,
+    "num_dynamic_obstacles": max(math.floor(map_size * 0.005), 1),
+    "rrt_max_iterations": rrt_max_iterations,
+    "rrt_step_size": rrt_step_size,
+    "rrt_goal_bias": rrt_goal_bias,
+    "replanning_threshold": max(math.floor(map_size * 0.005), 1),
+    "seed": seed
+  }
+
+def getScenarios(scenario_set: str) -> list:
+  """
+  Gets the scenarios of a fixed scenario set.
+
+  quick: two small maps, for checking a change in a few seconds.
+  standard: map sizes 200, 400 and 800, sparse (2.5%) and dense (5%)
+  obstacles, and small (0.5% of map size) and large (1%) RRT steps.
+
+  @param scenario_set: The name of the scenario set ("quick" or "standard")
+  @return: The scenarios of the set
+  """
+
+  if scenario_set == "quick":
+    return [
+      createScenario(200, 0.05, 2000, 2, 1),
+      createScenario(400, 0.05, 4000, 4, 2)
+    ]
+
+  if scenario_set == "standard":
+    scenarios = []
+    seed = 1
+
+    for map_size in (200, 400, 800):
+
+      for obstacle_density in (0.025, 0.05):
+
+        for step_percentage in (0.005, 0.01):
+          rrt_step_size = max(math.floor(map_size * step_percentage), 1)
+          scenarios.append(
+            createScenario(map_size, obstacle_density, 4000, rrt_step_size, seed)
+          )
+          seed += 1
+
+    return scenarios
+
+  raise ValueError(f"Unknown scenario set '{scenario_set}'.")
@@ -0,0 +1,186 @@
+import cv2
+import numpy as np
+
+# Clearances are capped at this distance, in pixels; it bounds the area that
+# is recomputed when obstacles are added, and the reach of clearance costs
+default_max_clearance = 32
+
+class ClearanceMap:
+  """
+  Distance from every cell of an occupancy grid to the nearest obstacle,
+  computed once with a distance transform and capped at max_clearance.
+
+  A robot with radius r fits on a cell when its clearance is more than r, so
+  a radius of 0 is the point robot of the occupancy grid. Planners read the
+  cells that are blocked for a radius, or the clearance costs for a weight,
+  from arrays that are cached and kept up to date in place, so their lookups
+  stay O(1). When obstacles are added, only the cells within max_clearance of
+  them are recomputed.
+  """
+
+  def __init__(self, grid, max_clearance: int = default_max_clearance) -> None:
+    """
+    Computes the clearance of every cell of the grid.
+
+    @param grid: The occupancy grid of the map
+    @param max_clearance: The distance clearances are capped at, in pixels (default is 32)
+    """
+
+    self.grid = grid
+    self.width = grid.width
+    self.height = grid.height
+    self.max_clearance = max_clearance
+    self.distances = self._distanceTransform(grid.cells)
+    # Flat (row-major) view of the distances, indexed by y * width + x
+    self.flat = self.distances.reshape(-1)
+    # Blocked cells by robot radius, and clearance costs by weight
+    self.blocked = {}
+    self.penalties = {}
+    # 4-connected component labels of the cells a robot fits on, by robot
+    # radius; computed on first use and again after obstacles are added
+    self.labels = {}
+
+  def componentLabels(self, radius: float) -> np.ndarray:
+    """
+    Gets the 4-connected component label of every cell a robot with the
+    provided radius fits on, labeling them first if obstacles were added
+    since the last call.
+
+    @param radius: The radius of the robot, in pixels
+    @return: The flat (row-major) labels, where 0 is a blocked cell
+    """
+
+    if radius not in self.labels:
+      _, labels = cv2.connectedComponents(
+        (self.blockedCells(radius) == 0).astype(np.uint8).reshape(self.height, self.width),
+        connectivity=4,
+        ltype=cv2.CV_32S
+      )
+      self.labels[radius] = labels.reshape(-1)
+
+    return self.labels[radius]
+
+  def areConnected(self, point1: tuple, point2: tuple, radius: float) -> bool:
+    """
+    Checks if a robot with the provided radius fits on two cells, and can move
+    between them on a 4-connected grid path.
+
+    @param point1: The (x, y) coordinates of the first cell
+    @param point2: The (x, y) coordinates of the second cell
+    @param radius: The radius of the robot, in pixels
+    @return: True if the cells are connected, False otherwise
+    """
+
+    labels = self.componentLabels(radius)
+    label1 = labels[int(point1[1]) * self.width + int(point1[0])]
+    label2 = labels[int(point2[1]) * self.width + int(point2[0])]
+
+    return label1 != 0 and label1 == label2
+
+  def blockedCells(self, radius: float) -> np.ndarray:
+    """
+    Gets the cells a robot with the provided radius does not fit on, i.e. the
+    obstacles inflated by the radius.
+
+    @param radius: The radius of the robot, in pixels (at most max_clearance)
+    @return: The flat (row-major) cells, where 1 is blocked and 0 is free
+    """
+
+    if radius not in self.blocked:
+      self.blocked[radius] = (self.flat <= radius).astype(np.uint8)
+
+    return self.blocked[radius]
+
+  def penaltyCosts(self, weight: float) -> np.ndarray:
+    """
+    Gets the extra cost of entering each cell, which falls linearly from
+    weight at an obstacle to 0 at max_clearance.
+
+    @param weight: The extra cost at an obstacle, relative to the cost of a straight move
+    @return: The flat (row-major) extra costs
+    """
+
+    if weight not in self.penalties:
+      self.penalties[weight] = self._penalties(self.flat, weight)
+
+    return self.penalties[weight]
+
+  def update(self, bounds: tuple) -> None:
+    """
+    Recomputes the clearances near cells that changed inside the provided
+    bounds. Only cells within max_clearance of the bounds can change, and
+    their nearest obstacles are within max_clearance of them, so the distance
+    transform runs on a window around the bounds.
+
+    @param bounds: The (x_min, y_min, x_max, y_max) bounds of the changed cells, inclusive
+    """
+
+    x_min, y_min, x_max, y_max = bounds
+    reach = self.max_clearance + 1
+    # Cells whose clearance can change
+    inner_x_min = max(x_min - reach, 0)
+    inner_y_min = max(y_min - reach, 0)
+    inner_x_max = min(x_max + reach, self.width - 1)
+    inner_y_max = min(y_max + reach, self.height - 1)
+    # Cells that can be the nearest obstacle of one of them
+    window_x_min = max(x_min - 2 * reach, 0)
+    window_y_min = max(y_min - 2 * reach, 0)
+    window_x_max = min(x_max + 2 * reach, self.width - 1)
+    window_y_max = min(y_max + 2 * reach, self.height - 1)
+    window_distances = self._distanceTransform(
+      self.grid.cells[window_y_min:window_y_max + 1, window_x_min:window_x_max + 1]
+    )
+    inner = (
+      slice(inner_y_min, inner_y_max + 1),
+      slice(inner_x_min, inner_x_max + 1)
+    )
+    distances = window_distances[
+      inner_y_min - window_y_min:inner_y_max - window_y_min + 1,
+      inner_x_min - window_x_min:inner_x_max - window_x_min + 1
+    ]
+    self.distances[inner] = distances
+    # Components may have split; relabel on next use
+    self.labels = {}
+
+    # Update the cached arrays in place, so views held by planners stay valid
+    for radius, blocked in self.blocked.items():
+      blocked.reshape(self.height, self.width)[inner] = distances <= radius
+
+    for weight, penalties in self.penalties.items():
+      penalties.reshape(self.height, self.width)[inner] = self._penalties(
+        distances,
+        weight
+      )
+
+  def _distanceTransform(self, cells: np.ndarray) -> np.ndarray:
+    """
+    Finds the capped Euclidean distance from every cell to the nearest
+    obstacle.
+
+    @param cells: The occupancy cells, where 1 is an obstacle
+    @return: The distances, as a float32 array of the same shape
+    """
+
+    distances = cv2.distanceTransform(
+      (cells == 0).astype(np.uint8),
+      cv2.DIST_L2,
+      cv2.DIST_MASK_PRECISE
+    )
+    distances = np.minimum(distances, self.max_clearance)
+    # The exact distances are square roots of whole numbers; snapping to them
+    # removes the rounding noise of the transform, so a window gives the same
+    # distances as the whole map
+    squared = np.rint(distances.astype(np.float64) ** 2)
+
+    return np.sqrt(squared).astype(np.float32)
+
+  def _penalties(self, distances: np.ndarray, weight: float) -> np.ndarray:
+    """
+    Finds the clearance costs of cells from their clearances.
+
+    @param distances: The clearances of the cells
+    @param weight: The cost of entering a cell next to an obstacle
+    @return: The extra cost of entering each cell
+    """
+
+    return weight * (1 - distances.astype(np.float64) / self.max_clearance)
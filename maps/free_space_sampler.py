@@ -0,0 +1,100 @@
+import numpy as np
+import random
+
+class FreeSpaceSampler:
+  """
+  Uniform sampler over the free cells of an occupancy grid.
+
+  The flat indices of the free cells are collected once. A sample picks a
+  random index in O(1); if that cell has since become an obstacle, it is
+  swapped out of the sampled range and another index is picked. New obstacles
+  are therefore picked up lazily from the grid, and every stale cell is
+  removed at most once.
+  """
+
+  def __init__(self, grid) -> None:
+    """
+    Collects the free cells of the grid.
+
+    @param grid: The occupancy grid of the map
+    """
+
+    self.grid = grid
+    self.width = grid.width
+    self.cells = np.flatnonzero(grid.flat == 0).astype(np.int64)
+    # Cells before this position have not been seen to be obstacles
+    self.count = len(self.cells)
+    # Memoryviews give fast scalar access to the arrays when sampling
+    self._blocked = memoryview(grid.flat)
+    self._cells = memoryview(self.cells)
+
+  def __len__(self) -> int:
+    return self.count
+
+  def sampleCell(self, rng: random.Random = None) -> int:
+    """
+    Picks a free cell uniformly at random.
+
+    @param rng: The random number generator (default is the global random module)
+    @return: The flat index of the cell, or -1 if no free cell is left
+    """
+
+    if rng is None:
+      rng = random
+
+    blocked = self._blocked
+    cells = self._cells
+
+    while self.count != 0:
+      position = rng.randrange(self.count)
+      cell = cells[position]
+
+      if not blocked[cell]:
+        return cell
+
+      # The cell became an obstacle; move it past the end of the sampled range
+      self.count -= 1
+      cells[position] = cells[self.count]
+      cells[self.count] = cell
+
+    return -1
+
+  def sample(
+    self,
+    rng: random.Random = None,
+    bias_points: list = None,
+    bias: float = 0.0,
+    bias_start: int = 0
+  ) -> tuple:
+    """
+    Picks a free point uniformly at random, or, with probability bias, one of
+    the bias points (e.g. the goal or the path to reconnect to).
+
+    @param rng: The random number generator (default is the global random module)
+    @param bias_points: The (x, y) points to bias towards (default is None)
+    @param bias: The probability of picking a bias point (default is 0.0)
+    @param bias_start: The position of the first bias point that can be picked (default is 0)
+    @return: The (x, y) point, or None if no free cell is left
+    """
+
+    if rng is None:
+      rng = random
+
+    if (
+      bias_points is not None
+      and bias_start < len(bias_points)
+      and bias > 0
+      and rng.random() < bias
+    ):
+      point = bias_points[rng.randrange(bias_start, len(bias_points))]
+
+      return (int(point[0]), int(point[1]))
+
+    cell = self.sampleCell(rng)
+
+    if cell < 0:
+      return None
+
+    y, x = divmod(cell, self.width)
+
+    return (x, y)
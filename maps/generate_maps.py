@@ -7,24 +7,51 @@ import time
 
 sys.path.append('./ai_robotics_final_project')
 
+from maps.image_writer import ImageWriter
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
 from utils.files import deleteImages
-from utils.points import drawInitialPoints, drawPathPoints, selectPathPoint
+from utils.metrics import recordMetrics, span
+from utils.points import selectPathPoint
+from utils.rng import createRng
 from utils.strings import getFormattedMapTitle
 
+# Dynamic obstacles leave the cells within this distance of the start and
+# goal points (the radius of their markers) unchanged, so both stay free
+initial_point_clearance = 10
+# Map snapshots that are not solutions; skipped when only solutions are saved
+intermediate_image_suffixes = { "initial", "dynamic_obstacle" }
+# Image output settings, set once from the command line arguments with
+# configureImageOutput()
+image_output = {
+  "headless": False,
+  "save_images": "all",
+  "writer": None
+}
+
 def generateMaps(
   map_size: int = 400,
   number_maps: int = 1,
   number_obstacles: int = 20,
-  verbose: bool = False
+  verbose: bool = False,
+  seed: int = None,
+  map_numbers: list = None,
+  map_metrics: list = None
 ) -> list:
   """
   Generates maps with random obstacles and saves them as images in the 
   <i>map/images/initial</i> folder.
 
+  With a seed, each map is generated from its own random stream, derived from
+  the seed and the map number, so any map can be generated again on its own.
+
   @param map_size: The size of the map (default is 400)
   @param number_maps: The number of maps to generate (default is 1)
   @param number_obstacles: The number of obstacles to generate (default is 20)
   @param verbose: Whether or not to print verbose output (default is False)
+  @param seed: The seed of the run (default is None, i.e. the global random module is used)
+  @param map_numbers: The numbers of the maps to generate (default is 1 to number_maps)
+  @param map_metrics: The metrics to record the generation of each map to, in map order (default is None, not recorded)
   @return: A list of generated maps
   """
 
@@ -33,31 +60,35 @@ def generateMaps(
 
   print("Generating maps...")
 
-  start_time = time.time()
+  start_time = time.perf_counter()
   maps = []
-  num_maps = number_maps
   num_obstacles = number_obstacles
   suffix = "initial"
 
+  if map_numbers is None:
+    map_numbers = range(1, number_maps + 1)
+
   # Generate maps
-  for i in range(num_maps):
-    # Create a blank image
-    map = np.zeros((map_size, map_size, 3), np.uint8)
-    map[:] = (255, 255, 255)  # White background
-    map_number = str(i + 1)
+  for position, map_number in enumerate(map_numbers):
+    rng = None
+
+    if seed is not None:
+      rng = createRng(seed, map_number, "map_generation")
 
-    # Generate random obstacles
-    for i in range(num_obstacles):
-      generateObstacle(map)
+    with recordMetrics(map_metrics[position] if map_metrics is not None else None):
+
+      with span("map_generation"):
+        map = generateMap(map_size, num_obstacles, rng)
+
+      saveMap(map, suffix, map_number, verbose)
 
-    saveMap(map, suffix, map_number, verbose)
     maps.append(np.array(map))
 
     if verbose:
       print(f"Map {map_number} generated successfully!")
   
   # Record execution time
-  end_time = time.time()
+  end_time = time.perf_counter()
   total_map_generation_time = end_time - start_time
 
   if verbose:
@@ -68,7 +99,36 @@ def generateMaps(
   
   return maps
 
-def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
+def generateMap(
+  map_size: int = 400,
+  number_obstacles: int = 20,
+  rng: random.Random = None
+) -> np.ndarray:
+  """
+  Generates a single map with random obstacles, without saving it.
+
+  @param map_size: The size of the map (default is 400)
+  @param number_obstacles: The number of obstacles to generate (default is 20)
+  @param rng: The random number generator (default is the global random module)
+  @return: The generated map
+  """
+
+  # Create a blank image
+  map = np.zeros((map_size, map_size, 3), np.uint8)
+  map[:] = (255, 255, 255)  # White background
+
+  # Generate random obstacles
+  for i in range(number_obstacles):
+    generateObstacle(map, rng=rng)
+
+  return map
+
+def generateObstacle(
+  map: list,
+  x_coord: int = -1,
+  y_coord: int = -1,
+  rng: random.Random = None
+) -> tuple:
   """
   Randomly place an obstacle on the map, if x_coord and y_coord are no provided,
   otherwise generate an obstacle at the specified coordinates.
@@ -76,8 +136,13 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
   @param map: The map to generate the obstacle on
   @param x_coord: The x-coordinate of the obstacle (default is -1)
   @param y_coord: The y-coordinate of the obstacle (default is -1)
+  @param rng: The random number generator (default is the global random module)
+  @return: The (x_min, y_min, x_max, y_max) bounds of the obstacle
   """
 
+  if rng is None:
+    rng = random
+
   # Set obstacle color to black
   color = (0, 0, 0)
   map_size = map.shape[0]
@@ -90,24 +155,24 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
   
   max_obstacle_radius = math.floor(map_size * max_obstacle_radius_percentage)
   min_obstacle_radius = math.floor(max_obstacle_radius * 0.2)
-  radius = random.randint(min_obstacle_radius, max_obstacle_radius)
+  radius = rng.randint(min_obstacle_radius, max_obstacle_radius)
   x = x_coord
   y = y_coord
 
   # If x_coord and y_coord are not provided, generate random coordinates
   if x_coord == -1 or y_coord == -1:
     # Randomly generate coordinates
-    x = random.randint(max_obstacle_radius, map_size - max_obstacle_radius)
-    y = random.randint(max_obstacle_radius, map_size - max_obstacle_radius)
+    x = rng.randint(max_obstacle_radius, map_size - max_obstacle_radius)
+    y = rng.randint(max_obstacle_radius, map_size - max_obstacle_radius)
 
   # circle = 0, ellipse = 1, triangle = 2, rectangle/square = 3
-  shape = random.randint(0, 3)
+  shape = rng.randint(0, 3)
 
   if shape == 0: # Draw a circle
     
     if x_coord == -1 and y_coord == -1:
-      orientation_x = random.randint(0, 2)
-      orientation_y = random.randint(0, 2)
+      orientation_x = rng.randint(0, 2)
+      orientation_y = rng.randint(0, 2)
 
       if orientation_x == 1:
         x = x - math.floor(radius / 2)
@@ -120,13 +185,14 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
         y = y - math.floor(radius / 2)
 
     cv2.circle(map, (x, y), radius, color, -1)
+    bounds = (x - radius, y - radius, x + radius, y + radius)
   elif shape == 1: # Draw an ellipse
-    axes_height = random.randint(min_obstacle_radius, max_obstacle_radius)
-    axes_width = random.randint(min_obstacle_radius, max_obstacle_radius)
+    axes_height = rng.randint(min_obstacle_radius, max_obstacle_radius)
+    axes_width = rng.randint(min_obstacle_radius, max_obstacle_radius)
     
     if x_coord == -1 and y_coord == -1:
-      orientation_x = random.randint(0, 2)
-      orientation_y = random.randint(0, 2)
+      orientation_x = rng.randint(0, 2)
+      orientation_y = rng.randint(0, 2)
 
       if orientation_x == 1:
         x = x - math.floor(axes_width / 2)
@@ -139,6 +205,7 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
         y = y - math.floor(axes_height / 2)
     
     cv2.ellipse(map, (x, y), (axes_width, axes_height), 0, 0, 360, color, -1)
+    bounds = (x - axes_width, y - axes_height, x + axes_width, y + axes_height)
   elif shape == 2: # Draw a triangle
     points = np.array(
       [
@@ -150,13 +217,14 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
     )
     points = points.reshape((-1, 1, 2))
     cv2.fillPoly(map, [points], color)
+    bounds = (x - math.floor(radius / 2), y - radius, x + math.floor(radius / 2), y)
   elif shape == 3: # Draw a rectangle
-    size_multiplier_x = random.randint(1, 3)
-    size_multiplier_y = random.randint(1, 3)
+    size_multiplier_x = rng.randint(1, 3)
+    size_multiplier_y = rng.randint(1, 3)
 
     if x_coord != -1 and y_coord != -1:
-      size_multiplier_x = random.randint(1, 2)
-      size_multiplier_y = random.randint(1, 2)
+      size_multiplier_x = rng.randint(1, 2)
+      size_multiplier_y = rng.randint(1, 2)
 
     size_x = math.floor(radius * size_multiplier_x / 2)
     size_y = math.floor(radius * size_multiplier_y / 2)
@@ -166,8 +234,8 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
     y2 = y + size_y
 
     if x_coord == -1 and y_coord == -1:
-      orientation_x = random.randint(0, 1)
-      orientation_y = random.randint(0, 1)
+      orientation_x = rng.randint(0, 1)
+      orientation_y = rng.randint(0, 1)
 
       if orientation_x == 0:
         x2 = x - size_x
@@ -176,6 +244,44 @@ def generateObstacle(map: list, x_coord: int = -1, y_coord: int = -1) -> None:
         y2 = y + size_y
 
     cv2.rectangle(map, (x, y), (x2, y2), color, -1)
+    bounds = (min(x, x2), min(y, y2), max(x, x2), max(y, y2))
+
+  return bounds
+
+def configureImageOutput(
+  headless: bool = False,
+  save_images: str = "all",
+  image_writer_threads: int = 0
+) -> None:
+  """
+  Configure how map images are displayed and saved.
+
+  @param headless: Whether or not to skip opening windows for maps (default is False)
+  @param save_images: Which images to save: "all", "solutions" or "none" (default is "all")
+  @param image_writer_threads: The number of background image writer threads, or 0 to save synchronously (default is 0)
+  """
+
+  finishImageOutput()
+
+  image_output["headless"] = headless
+  image_output["save_images"] = save_images
+
+  if image_writer_threads > 0:
+    image_output["writer"] = ImageWriter(
+      image_writer_threads,
+      image_writer_threads * 4
+    )
+
+def finishImageOutput() -> None:
+  """
+  Wait for all queued map images to be saved.
+  """
+
+  writer = image_output["writer"]
+
+  if writer is not None:
+    image_output["writer"] = None
+    writer.shutdown()
 
 def displayMap(
   map: list,
@@ -184,9 +290,9 @@ def displayMap(
   verbose: bool = False
 ) -> None:
   """
-  Display and save the provided map.
+  Display and save the provided map. In headless mode the map is only saved.
 
-  @param map: The map to display
+  @param map: The map to display (a map image or a layered map)
   @param filename_suffix: The filename suffix for the map
   @param number: The number of the map
   @param verbose: Whether or not to print verbose output (default is False)
@@ -194,6 +300,15 @@ def displayMap(
 
   title = getFormattedMapTitle(filename_suffix, number)
 
+  if isinstance(map, LayeredMap):
+
+    with span("rendering"):
+      map = map.composite()
+
+  if image_output["headless"]:
+    saveMap(map, filename_suffix, number, verbose)
+    return
+
   if verbose:
     print(f"Displaying {title}...")
 
@@ -211,12 +326,23 @@ def saveMap(
   """
   Save the provided map, as a PNG image.
 
-  @param map: The map to save
+  @param map: The map to save (a map image or a layered map)
   @param filename_suffix: The filename suffix for the map
   @param number: The number of the map
   @param verbose: Whether or not to print verbose output (default is False)
   """
 
+  save_images = image_output["save_images"]
+
+  if (
+    save_images == "none"
+    or (
+      save_images == "solutions"
+      and filename_suffix in intermediate_image_suffixes
+    )
+  ):
+    return
+
   title = getFormattedMapTitle(filename_suffix, number)
 
   if verbose:
@@ -232,76 +358,126 @@ def saveMap(
   filename = images_folder_path + map_filename + ".png"
   filename = filename.replace("*", "_star")
 
-  cv2.imwrite(filename, map)
+  if isinstance(map, LayeredMap):
 
-  if verbose:
-    print(title + " saved successfully!")
+    with span("rendering"):
+      map = map.composite()
+
+  writer = image_output["writer"]
+
+  if writer is not None:
+
+    # Encode and write in the background; only waiting for a full queue is
+    # timed
+    with span("io"):
+      writer.submit(filename, map)
+
+    if verbose:
+      print(title + " queued for saving!")
+
+  else:
+
+    with span("io"):
+      cv2.imwrite(filename, map)
+
+    if verbose:
+      print(title + " saved successfully!")
 
 def generateDynamicObstacle(
-  map: list,
+  map: LayeredMap,
+  grid: OccupancyGrid,
   path: list,
-  start: cv2.typing.Point,
-  goal: cv2.typing.Point,
   num_dynamic_obstacles: int,
-  verbose: bool = False
-) -> None:
+  verbose: bool = False,
+  rng: random.Random = None
+) -> tuple:
   """
-  Generate a dynamic obstacle on the map at the specified coordinates.
-
-  @param map: The map to generate the dynamic obstacle on
+  Generate a dynamic obstacle on the map at the specified coordinates. The
+  obstacles are drawn on the base of the map, so they hide the paths drawn
+  under them. The cells within initial_point_clearance of the start and goal
+  points (the first and last points of the path) are left unchanged, so both
+  stay free and visible.
+
+  @param map: The layered map to generate the dynamic obstacle on
+  @param grid: The occupancy grid of the map, kept in sync with new obstacles
   @param path: The path to select a point from
-  @param start: The start point
-  @param goal: The goal point
   @param num_dynamic_obstacles: The number of dynamic obstacles to generate
   @param verbose: Whether or not to print verbose output (default is False)
+  @param rng: The random number generator (default is the global random module)
+  @return: The (x, y) coordinates of the cells that became obstacles, as an Nx2 array sorted by x and then y; each cell is listed once, even if several obstacles cover it, and the grid changed at exactly these cells. Also the sorted positions of the path points those cells cover
   """
 
-  original_path_length = len(path)
-  path_color = (0, 0, 255)
-  path_covered = path.copy()
-  path_points_covered = 0
+  path_points = np.asarray(path, dtype=np.intp).reshape(-1, 2)
+  # The flat cells of the path, sorted once, so the path positions under the
+  # cells an obstacle changed are found by binary search
+  path_cells = path_points[:, 1] * grid.width + path_points[:, 0]
+  path_order = np.argsort(path_cells, kind="stable")
+  sorted_path_cells = path_cells[path_order]
+  # The sorted path positions covered by a dynamic obstacle
+  covered_positions = np.empty(0, dtype=np.intp)
+  changed_cells = [np.empty((0, 2), dtype=np.intp)]
+  # The cells around the start and goal points
+  initial_point_windows = [
+    np.s_[
+      max(y - initial_point_clearance, 0):y + initial_point_clearance + 1,
+      max(x - initial_point_clearance, 0):x + initial_point_clearance + 1
+    ]
+    for x, y in (path_points[0], path_points[-1])
+  ]
 
   print(f"Generating {num_dynamic_obstacles} dynamic obstacles...")
 
   for i in range(num_dynamic_obstacles):
     obstacle_number = i + 1
-    # Select a random point along the path
-    dynamicObstacleCoords = selectPathPoint(path_covered, verbose)
+    # Select a random point along the uncovered part of the path
+    dynamicObstacleCoords = selectPathPoint(
+      path_points,
+      verbose,
+      rng,
+      covered_positions
+    )
 
     if verbose:
       print(f"Generating dynamic obstacle {obstacle_number}...")
 
+    base = map.writableBase()
+    initial_point_cells = [base[window].copy() for window in initial_point_windows]
     # Generate a dynamic obstacle
-    generateObstacle(map, dynamicObstacleCoords[0], dynamicObstacleCoords[1])
+    bounds = generateObstacle(
+      base,
+      dynamicObstacleCoords[0],
+      dynamicObstacleCoords[1],
+      rng
+    )
+
+    # Restore the cells around the start and goal points
+    for window, cells in zip(initial_point_windows, initial_point_cells):
+      base[window] = cells
+
+    # Keep the occupancy grid in sync with the new obstacle; only the cells
+    # inside its bounds are read
+    obstacle_cells = grid.syncRegion(map.base, bounds)
+    changed_cells.append(obstacle_cells)
 
     if verbose:
       print(f"Dynamic obstacle {obstacle_number} generated successfully!")
-    
-    # Get all points that are part of the path (i.e. are red)
-    current_path_points = np.unique(
-      np.argwhere(cv2.inRange(map, path_color, path_color)), axis=0
-    )
-    # Swap columns to get (x, y) format
-    current_path_points[:, [1, 0]] = current_path_points[:, [0, 1]]
-    # Convert to list of tuples
-    current_path_points = list(tuple(point) for point in current_path_points)
-    path_points_covered = len(path_covered) - len(current_path_points)
-    # Update path to keep points that are not covered by the dynamic obstacles,
-    # while preserving the order of the points from the original path
-    path_covered = [
-      point for point in path_covered if point in current_path_points
-    ]
 
-    if verbose:
-      print(f"Path points covered by dynamic obstacle {obstacle_number}: {path_points_covered}")
-  
-  # Redraw start/goal points to prevent them from being hidden by obstacle
-  drawInitialPoints(map, start, goal)
-  drawPathPoints(map, path_covered, path_color, verbose)
+    # Mark the path positions of the cells that became obstacles; a cell the
+    # path visits more than once matches a run of equal sorted path cells.
+    # The cells were free before, so none of these positions was covered yet
+    obstacle_flat_cells = obstacle_cells[:, 1] * grid.width + obstacle_cells[:, 0]
+    run_starts = np.searchsorted(sorted_path_cells, obstacle_flat_cells, side="left")
+    run_lengths = np.searchsorted(sorted_path_cells, obstacle_flat_cells, side="right") - run_starts
+    run_offsets = np.arange(run_lengths.sum()) - np.repeat(np.cumsum(run_lengths) - run_lengths, run_lengths)
+    newly_covered = path_order[np.repeat(run_starts, run_lengths) + run_offsets]
+    covered_positions = np.union1d(covered_positions, newly_covered)
 
-  path_covered = []
+    if verbose:
+      print(f"Path points covered by dynamic obstacle {obstacle_number}: {len(newly_covered)}")
 
   if verbose:
-    print(f"Total path points covered by new dynamic obstacles: {original_path_length - len(path)}")
+    print(f"Total path points covered by new dynamic obstacles: {len(covered_positions)}")
 
   print(f"{num_dynamic_obstacles} dynamic obstacles generated successfully!")
+
+  return np.unique(np.concatenate(changed_cells), axis=0), covered_positions
@@ -0,0 +1,71 @@
+import cv2
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+class ImageWriter:
+  """
+  Bounded background thread pool that encodes and writes map images, so the
+  planning loop does not wait on PNG compression and disk I/O.
+
+  At most max_pending images can be queued or in flight; submit() blocks when
+  the queue is full, which keeps memory bounded when images are produced
+  faster than they can be written.
+  """
+
+  def __init__(self, max_workers: int = 2, max_pending: int = 8) -> None:
+    """
+    Creates the writer pool.
+
+    @param max_workers: The number of writer threads (default is 2)
+    @param max_pending: The maximum number of queued or in-flight images (default is 8)
+    """
+
+    self.executor = ThreadPoolExecutor(
+      max_workers=max(max_workers, 1),
+      thread_name_prefix="image_writer"
+    )
+    self.slots = threading.BoundedSemaphore(max(max_pending, 1))
+    self.failed_filenames = []
+
+  def submit(self, filename: str, image) -> Future:
+    """
+    Queues an image to be written, blocking while the queue is full.
+
+    @param filename: The path of the image file
+    @param image: The image to write (a private copy is taken)
+    @return: The future of the write
+    """
+
+    # Backpressure: wait for a free slot before copying the image
+    self.slots.acquire()
+
+    try:
+      future = self.executor.submit(self._write, filename, image.copy())
+    except BaseException:
+      self.slots.release()
+      raise
+
+    future.add_done_callback(lambda _: self.slots.release())
+
+    return future
+
+  def shutdown(self) -> None:
+    """
+    Waits for all queued images to be written and stops the writer threads.
+    """
+
+    self.executor.shutdown(wait=True)
+
+    for filename in self.failed_filenames:
+      print(f"Failed to save image: {filename}")
+
+  def _write(self, filename: str, image) -> None:
+    """
+    Encodes and writes an image.
+
+    @param filename: The path of the image file
+    @param image: The image to write
+    """
+
+    if not cv2.imwrite(filename, image):
+      self.failed_filenames.append(filename)
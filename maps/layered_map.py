@@ -0,0 +1,226 @@
+import cv2
+import numpy as np
+
+# Overlay layers, from bottom to top. Each planner draws on its own layer, so
+# the stacking replaces the old rule of only drawing over certain pixel colors
+layer_order = (
+  "initial_points",
+  "rrt_tree",
+  "d_star",
+  "rrt_path",
+  "replanning"
+)
+# Layers that are drawn over obstacles; the others are hidden by obstacles
+# added after they were drawn
+layers_over_obstacles = { "initial_points" }
+# Layers that hold paths, and are removed by clearPaths()
+path_layers = ("rrt_tree", "d_star", "rrt_path", "replanning")
+
+class LayeredMap:
+  """
+  A map image split into an occupancy base (white free space and black
+  obstacles) and overlay layers that the planners draw on. The layers are
+  only composited into one image when the map is displayed or saved.
+
+  Layers are BGRA images allocated on first draw (alpha marks the drawn
+  pixels), so clearing a layer just drops it. Copies share the base and the
+  layers, and an array is only copied when one of the maps writes to it.
+  """
+
+  def __init__(self, base: np.ndarray) -> None:
+    """
+    Creates a layered map with no overlays.
+
+    @param base: The map image with obstacles (used without copying)
+    """
+
+    self.shape = base.shape
+    # Each array is stored with a shared owner count, for copy-on-write
+    self._base = (base, [1])
+    self._layers = {}
+
+  @property
+  def base(self) -> np.ndarray:
+    """
+    The occupancy base image, for reading.
+    """
+
+    return self._base[0]
+
+  def writableBase(self) -> np.ndarray:
+    """
+    Gets the occupancy base image for drawing obstacles, copying it first if
+    it is shared with another map.
+
+    @return: The base image
+    """
+
+    self._base = self._ownArray(self._base)
+
+    return self._base[0]
+
+  def layer(self, name: str) -> np.ndarray:
+    """
+    Gets an overlay layer for drawing, allocating it or copying it first if
+    it is shared with another map.
+
+    @param name: The name of the layer (one of layer_order)
+    @return: The BGRA layer image
+    """
+
+    entry = self._layers.get(name)
+
+    if entry is None:
+      entry = (np.zeros(self.shape[:2] + (4,), np.uint8), [1])
+    else:
+      entry = self._ownArray(entry)
+
+    self._layers[name] = entry
+
+    return entry[0]
+
+  def clearLayers(self, names: tuple = path_layers) -> None:
+    """
+    Removes overlay layers.
+
+    @param names: The names of the layers to remove (default is the path layers)
+    """
+
+    for name in names:
+      entry = self._layers.pop(name, None)
+
+      if entry is not None:
+        entry[1][0] -= 1
+
+  def copy(self) -> "LayeredMap":
+    """
+    Creates a copy-on-write copy of the map.
+
+    @return: The copy
+    """
+
+    copy = LayeredMap.__new__(LayeredMap)
+    copy.shape = self.shape
+    copy._base = self._base
+    copy._layers = dict(self._layers)
+    self._base[1][0] += 1
+
+    for entry in self._layers.values():
+      entry[1][0] += 1
+
+    return copy
+
+  def composite(self) -> np.ndarray:
+    """
+    Composites the base and the overlay layers into one BGR image.
+
+    @return: The composited image
+    """
+
+    image = self.base.copy()
+    obstacles = None
+
+    for name in layer_order:
+      entry = self._layers.get(name)
+
+      if entry is None:
+        continue
+
+      overlay = entry[0]
+      drawn = overlay[:, :, 3] != 0
+
+      if name not in layers_over_obstacles:
+
+        if obstacles is None:
+          obstacles = np.all(self.base == 0, axis=-1)
+
+        drawn &= ~obstacles
+
+      image[drawn] = overlay[:, :, :3][drawn]
+
+    return image
+
+  def drawCircle(
+    self,
+    name: str,
+    center: tuple,
+    radius: int,
+    color: tuple
+  ) -> None:
+    """
+    Draws a filled circle on an overlay layer.
+
+    @param name: The name of the layer
+    @param center: The (x, y) center of the circle
+    @param radius: The radius of the circle
+    @param color: The BGR color of the circle
+    """
+
+    cv2.circle(
+      self.layer(name),
+      (int(center[0]), int(center[1])),
+      radius,
+      tuple(color) + (255,),
+      -1
+    )
+
+  def drawLine(
+    self,
+    name: str,
+    point1: tuple,
+    point2: tuple,
+    color: tuple
+  ) -> None:
+    """
+    Draws a one pixel wide line on an overlay layer.
+
+    @param name: The name of the layer
+    @param point1: The (x, y) start of the line
+    @param point2: The (x, y) end of the line
+    @param color: The BGR color of the line
+    """
+
+    cv2.line(
+      self.layer(name),
+      (int(point1[0]), int(point1[1])),
+      (int(point2[0]), int(point2[1])),
+      tuple(color) + (255,),
+      1
+    )
+
+  def drawPolylines(self, name: str, polylines: list, color: tuple) -> None:
+    """
+    Draws one pixel wide open polylines on an overlay layer, in one call.
+
+    @param name: The name of the layer
+    @param polylines: The (x, y) points of each polyline, as Nx2 arrays of at least two points
+    @param color: The BGR color of the polylines
+    """
+
+    if len(polylines) == 0:
+      return
+
+    cv2.polylines(
+      self.layer(name),
+      [np.ascontiguousarray(polyline, dtype=np.int32) for polyline in polylines],
+      False,
+      tuple(color) + (255,),
+      1
+    )
+
+  def _ownArray(self, entry: tuple) -> tuple:
+    """
+    Makes sure an array is only used by this map, copying it if it is shared.
+
+    @param entry: The (array, owner count) entry
+    @return: The entry to store, with an array owned by this map
+    """
+
+    array, owners = entry
+
+    if owners[0] == 1:
+      return entry
+
+    owners[0] -= 1
+
+    return (array.copy(), [1])
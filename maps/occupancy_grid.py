@@ -0,0 +1,144 @@
+import cv2
+import numpy as np
+import sys
+
+sys.path.append('./ai_robotics_final_project')
+
+from maps.clearance_map import ClearanceMap
+from maps.free_space_sampler import FreeSpaceSampler
+
+class OccupancyGrid:
+  """
+  Boolean occupancy layer for a map image. The grid is built once from the BGR
+  map and kept in sync when obstacles are added, so planners can test cells
+  with O(1) indexed lookups instead of reading (and formatting) image pixels.
+  """
+
+  def __init__(self, map: np.ndarray) -> None:
+    """
+    Builds the occupancy grid from the provided map image.
+
+    @param map: The map image with obstacles (black pixels are obstacles)
+    """
+
+    self.height, self.width = map.shape[:2]
+    # 1 = obstacle, 0 = free space
+    self.cells = np.all(map == 0, axis=-1).astype(np.uint8)
+    # Flat (row-major) view of the cells, indexed by y * width + x
+    self.flat = self.cells.reshape(-1)
+    # 4-connected component label of each cell (0 = obstacle), computed on
+    # first use and again after obstacles are added
+    self.labels = None
+    self.label_sizes = None
+    # Free-space sampler, created on first use; it drops cells that become
+    # obstacles by itself
+    self.sampler = None
+    # Clearance map, created on first use and updated when obstacles are added
+    self.clearance = None
+
+  def areConnected(
+    self,
+    point1: tuple,
+    point2: tuple,
+    robot_radius: float = 0
+  ) -> bool:
+    """
+    Checks if two cells are in the same 4-connected component of free space,
+    i.e. if a grid path exists between them.
+
+    @param point1: The (x, y) coordinates of the first cell
+    @param point2: The (x, y) coordinates of the second cell
+    @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+    @return: True if the cells are free and connected, False otherwise
+    """
+
+    if robot_radius > 0:
+      return self.clearanceMap().areConnected(point1, point2, robot_radius)
+
+    labels = self.componentLabels()
+    label1 = labels[int(point1[1]) * self.width + int(point1[0])]
+    label2 = labels[int(point2[1]) * self.width + int(point2[0])]
+
+    return label1 != 0 and label1 == label2
+
+  def clearanceMap(self) -> ClearanceMap:
+    """
+    Gets the distance from every cell to the nearest obstacle.
+
+    @return: The clearance map
+    """
+
+    if self.clearance is None:
+      self.clearance = ClearanceMap(self)
+
+    return self.clearance
+
+  def componentLabels(self) -> np.ndarray:
+    """
+    Gets the 4-connected component label of every cell, labeling the free
+    space first if it changed since the last call.
+
+    @return: The flat (row-major) labels, where 0 is an obstacle
+    """
+
+    if self.labels is None:
+      _, labels = cv2.connectedComponents(
+        (self.cells == 0).astype(np.uint8),
+        connectivity=4,
+        ltype=cv2.CV_32S
+      )
+      self.labels = labels.reshape(-1)
+      self.label_sizes = np.bincount(self.labels)
+
+    return self.labels
+
+  def freeSpaceSampler(self) -> FreeSpaceSampler:
+    """
+    Gets the uniform sampler over the free cells of the grid.
+
+    @return: The free-space sampler
+    """
+
+    if self.sampler is None:
+      self.sampler = FreeSpaceSampler(self)
+
+    return self.sampler
+
+  def syncRegion(self, map: np.ndarray, bounds: tuple) -> np.ndarray:
+    """
+    Updates the grid from the map image inside the provided bounds, after an
+    obstacle has been drawn there.
+
+    @param map: The map image with obstacles
+    @param bounds: The (x_min, y_min, x_max, y_max) bounds to update, inclusive
+    @return: The (x, y) coordinates of the cells that changed, as an Nx2 array
+    """
+
+    x_min, y_min, x_max, y_max = bounds
+    x_min = max(x_min, 0)
+    y_min = max(y_min, 0)
+    x_max = min(x_max, self.width - 1)
+    y_max = min(y_max, self.height - 1)
+
+    if x_min > x_max or y_min > y_max:
+      return np.empty((0, 2), dtype=np.intp)
+
+    region = self.cells[y_min:y_max + 1, x_min:x_max + 1]
+    updated_region = np.all(
+      map[y_min:y_max + 1, x_min:x_max + 1] == 0, axis=-1
+    ).astype(np.uint8)
+    changed = np.argwhere(region != updated_region)
+    region[:] = updated_region
+
+    if len(changed) != 0:
+      # Components may have split; relabel on next use
+      self.labels = None
+      self.label_sizes = None
+
+      if self.clearance is not None:
+        self.clearance.update((x_min, y_min, x_max, y_max))
+
+    # Convert (row, column) offsets to (x, y) map coordinates
+    changed = changed[:, ::-1] + (x_min, y_min)
+
+    return changed
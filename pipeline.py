@@ -0,0 +1,466 @@
+import contextlib
+import io
+import math
+import random
+import sys
+
+sys.path.append('./ai_robotics_final_project')
+
+from algorithms.d_star import executeDStar
+from algorithms.d_star_lite import DStarLite, executeDStarLite
+from algorithms.hpa_star import HPAStar, executeHPAStar
+from algorithms.replanning import executeReplanning
+from algorithms.rrt import executeRRT
+from algorithms.rrt_connect import executeRRTConnect
+from maps.generate_maps import (
+  configureImageOutput,
+  displayMap,
+  generateDynamicObstacle,
+  saveMap
+)
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.deadline import createDeadline
+from utils.metrics import Metrics, recordMetrics, span
+from utils.profiling import configureProfiling
+from utils.points import (
+  clearPaths,
+  drawPathPoints,
+  expandPath,
+  selectInitialPoints
+)
+
+d_star_path_color = (0, 0, 255) # Red
+replanning_path_color = (255, 0, 255) # Purple
+
+def processMap(
+  map: list,
+  map_number: int,
+  map_size: int,
+  num_dynamic_obstacles: int,
+  rrt_max_iterations: int,
+  rrt_step_size: int,
+  rrt_goal_bias: float,
+  replanning_threshold: int,
+  verbose: bool = False,
+  rng: random.Random = None,
+  d_star_planner: str = "lite",
+  robot_radius: float = 0,
+  clearance_weight: float = 0,
+  rrt_planner: str = "rrt",
+  time_budget: float = None,
+  anytime: bool = False,
+  cluster_size: int = 32
+) -> dict:
+  """
+  Runs the full pipeline for one map: the initial D* and RRT solutions, the
+  dynamic obstacle simulation, RRT replanning and the D* rerun.
+
+  @param map: The map image with obstacles (obstacles are drawn on it)
+  @param map_number: The number of the map
+  @param map_size: The length and width of the map, in pixels
+  @param num_dynamic_obstacles: The number of dynamic obstacles to generate
+  @param rrt_max_iterations: Maximum number of iterations for the RRT algorithm
+  @param rrt_step_size: The step size for the RRT algorithm
+  @param rrt_goal_bias: The probability of the RRT sampling the goal (or the path to reconnect to)
+  @param replanning_threshold: The maximum number of obstacles to encounter before rerunning D*
+  @param verbose: Whether or not to print verbose output (default is False)
+  @param rng: The random number generator of the map (default is the global random module)
+  @param d_star_planner: The D* planner ("lite" for incremental D* Lite, "hpa" for hierarchical HPA*, or one of the grid planners "4", "8" and "theta"; default is "lite")
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot; not supported by D* Lite)
+  @param clearance_weight: The extra cost of a D* path cell next to an obstacle (default is 0; not supported by D* Lite, HPA* or Theta*)
+  @param rrt_planner: The RRT planner ("rrt" for RRT, "connect" for RRT-Connect; default is "rrt")
+  @param time_budget: The seconds each planner run may take before it returns its best path so far (default is None, no limit; not supported by D* Lite or HPA*)
+  @param anytime: Whether or not the planners improve their first path until their time budget runs out (default is False)
+  @param cluster_size: The length and width of the HPA* clusters, in pixels (default is 32)
+  @return: The path lengths and execution times of the map
+  """
+
+  d_star_dynamic_obstacle_path_length = 0
+  d_star_dynamic_obstacle_time = 0
+  rrt_initial_path_length = 0
+  rrt_initial_time = 0
+  rrt_replanning_path_length = 0
+  rrt_replanning_time = 0
+  replanning_map = None
+  # The planners draw on overlay layers of the map, which are only composited
+  # with the obstacles when an image is saved
+  map = LayeredMap(map)
+  # Build the occupancy grid once; the map image is only used for rendering
+  grid = OccupancyGrid(map.base)
+
+  with span("point_selection"):
+    start, goal = selectInitialPoints(grid, verbose, rng, robot_radius)
+
+  # D* algorithm (D* Lite keeps its search state, and HPA* its abstract
+  # graph, for the rerun below)
+  with span("d_star_initial") as d_star_initial_span:
+
+    if d_star_planner == "lite":
+      d_star_lite = DStarLite(grid, start, goal)
+      d_star_initial_solution_path = executeDStarLite(map, d_star_lite, verbose=verbose)
+    elif d_star_planner == "hpa":
+      hpa_star = HPAStar(grid, cluster_size, robot_radius)
+      d_star_initial_solution_path = executeHPAStar(
+        map,
+        hpa_star,
+        start,
+        goal,
+        verbose=verbose
+      )
+    else:
+      d_star_initial_solution_path, _ = executeDStar(
+        map,
+        grid,
+        start,
+        goal,
+        verbose,
+        d_star_planner,
+        robot_radius,
+        clearance_weight,
+        createDeadline(time_budget),
+        anytime
+      )
+      # Theta* returns waypoints; the rest of the pipeline walks the cells
+      d_star_initial_solution_path = toCellPath(d_star_initial_solution_path)
+
+  d_star_initial_time = d_star_initial_span["seconds"]
+  map_solution_time = d_star_initial_time
+  d_star_initial_path_length = len(d_star_initial_solution_path)
+
+  if d_star_initial_path_length != 0:
+    drawPathPoints(map, grid, d_star_initial_solution_path, d_star_path_color, verbose)
+    displayMap(map, "d*_initial_solution", map_number, verbose)
+
+    print()
+
+    rrt_initial_solution_path = [start]
+    # RRT Algorithm
+    with span("rrt_initial") as rrt_initial_span:
+      execute = executeRRTConnect if rrt_planner == "connect" else executeRRT
+      rrt_initial_solution_path, _ = execute(
+        map,
+        grid,
+        rrt_initial_solution_path,
+        [goal],
+        rrt_max_iterations,
+        rrt_step_size,
+        verbose,
+        rng=rng,
+        goal_bias=rrt_goal_bias,
+        robot_radius=robot_radius,
+        deadline=createDeadline(time_budget),
+        anytime=anytime
+      )
+
+    rrt_initial_time = rrt_initial_span["seconds"]
+    map_solution_time += rrt_initial_time
+    rrt_initial_path_length = len(rrt_initial_solution_path)
+
+    if rrt_initial_path_length != 0:
+      displayMap(map, "rrt_initial_solution", map_number, verbose)
+
+      print()
+
+    else:
+      saveMap(map, "rrt_initial_failure", map_number, verbose)
+
+      print("The RRT algorithm was unable to find a solution using the provided parameters.")
+      print()
+
+    # Clear paths from the map
+    clearPaths(map, verbose)
+    # Redraw D* solution path
+    drawPathPoints(map, grid, d_star_initial_solution_path, d_star_path_color, verbose)
+
+    # Dynamic Obstacle Simulation
+    if len(d_star_initial_solution_path) < math.floor(map_size * 0.05):
+      print("D* path is too short to generate dynamic obstacles. Skipping dynamic obstacle simulation...")
+      print()
+
+    else:
+
+      if num_dynamic_obstacles == math.floor(map_size * 0.005):
+
+        if len(d_star_initial_solution_path) < math.floor(map_size * 0.15):
+          num_dynamic_obstacles = 1
+
+          print("Path too short. Reduced number of dynamic obstacles to 1.")
+
+        elif len(d_star_initial_solution_path) < math.floor(map_size * 0.4):
+          num_dynamic_obstacles = math.floor(num_dynamic_obstacles / 2)
+
+          print(f"Path too short. Reduced number of dynamic obstacles to {num_dynamic_obstacles}.")
+
+      print("Simulating dynamic obstacle(s)...")
+
+      # Generate dynamic obstacles at selected point
+      with span("dynamic_obstacles"):
+        changed_cells, _ = generateDynamicObstacle(
+          map,
+          grid,
+          d_star_initial_solution_path,
+          num_dynamic_obstacles,
+          verbose,
+          rng
+        )
+
+      # Save the generated map with dynamic obstacles
+      saveMap(map, "dynamic_obstacle", map_number, verbose)
+
+      print()
+
+      # Clear paths from the map
+      clearPaths(map, verbose)
+      # Replanning Algorithm
+      with span("rrt_replanning") as rrt_replanning_span:
+        rrt_replanning_solution_path, _ = executeReplanning(
+          map,
+          grid,
+          d_star_initial_solution_path,
+          replanning_threshold,
+          rrt_max_iterations,
+          rrt_step_size,
+          verbose,
+          rng,
+          rrt_goal_bias,
+          robot_radius,
+          rrt_planner,
+          createDeadline(time_budget)
+        )
+
+      rrt_replanning_time = rrt_replanning_span["seconds"]
+      map_solution_time += rrt_replanning_time
+      rrt_replanning_path_length = len(rrt_replanning_solution_path)
+
+      if rrt_replanning_path_length != 0:
+        drawPathPoints(map, grid, d_star_initial_solution_path, d_star_path_color, verbose)
+        displayMap(map, "rrt_replanning_solution", map_number, verbose)
+
+        clearPaths(map, verbose)
+
+        # Copy-on-write copy; only the layers drawn on are copied
+        replanning_map = map.copy()
+
+        drawPathPoints(
+          replanning_map,
+          grid,
+          rrt_replanning_solution_path,
+          replanning_path_color,
+          verbose,
+          "replanning"
+        )
+        displayMap(replanning_map, "replanning_only_solution", map_number, verbose)
+
+        print()
+
+      else:
+        saveMap(map, "rrt_replanning_failure", map_number, verbose)
+
+        print("RRT Replanning failed.")
+        print()
+
+      # Clear paths from the map
+      clearPaths(map, verbose)
+
+      print("Rerunning D* algorithm...")
+
+      with span("d_star_dynamic_obstacle") as d_star_dynamic_obstacle_span:
+
+        if d_star_planner == "lite":
+          # Repair the D* search with the cells changed by the dynamic obstacles
+          d_star_dynamic_obstacle_solution_path = executeDStarLite(
+            map,
+            d_star_lite,
+            changed_cells,
+            verbose
+          )
+        elif d_star_planner == "hpa":
+          # Update the clusters around the cells changed by the dynamic
+          # obstacles
+          d_star_dynamic_obstacle_solution_path = executeHPAStar(
+            map,
+            hpa_star,
+            start,
+            goal,
+            changed_cells,
+            verbose
+          )
+        else:
+          d_star_dynamic_obstacle_solution_path, _ = executeDStar(
+            map,
+            grid,
+            start,
+            goal,
+            verbose,
+            d_star_planner,
+            robot_radius,
+            clearance_weight,
+            createDeadline(time_budget),
+            anytime
+          )
+          d_star_dynamic_obstacle_solution_path = toCellPath(
+            d_star_dynamic_obstacle_solution_path
+          )
+
+      d_star_dynamic_obstacle_time = d_star_dynamic_obstacle_span["seconds"]
+      map_solution_time += d_star_dynamic_obstacle_time
+      d_star_dynamic_obstacle_path_length = len(
+        d_star_dynamic_obstacle_solution_path
+      )
+
+      if d_star_dynamic_obstacle_path_length != 0:
+        drawPathPoints(
+          map,
+          grid,
+          d_star_dynamic_obstacle_solution_path,
+          d_star_path_color,
+          verbose
+        )
+        displayMap(map, "d*_dynamic_obstacle_solution", map_number, verbose)
+
+        print()
+
+        if replanning_map is not None:
+          drawPathPoints(
+            replanning_map,
+            grid,
+            d_star_dynamic_obstacle_solution_path,
+            d_star_path_color,
+            verbose
+          )
+          displayMap(replanning_map, "d*_and_rrt_replanning_solution", map_number, verbose)
+
+        print()
+
+      else:
+        print("There is no path between the start and goal points for the dynamic obstacle map.")
+        print()
+
+  else:
+    print("There is no path between the start and goal points for this map.")
+    print()
+
+  result = {
+    "map_number": map_number,
+    "d_star_initial_path_length": d_star_initial_path_length,
+    "d_star_initial_time": d_star_initial_time,
+    "rrt_initial_path_length": rrt_initial_path_length,
+    "rrt_initial_time": rrt_initial_time,
+    "rrt_replanning_path_length": rrt_replanning_path_length,
+    "rrt_replanning_time": rrt_replanning_time,
+    "d_star_dynamic_obstacle_path_length": d_star_dynamic_obstacle_path_length,
+    "d_star_dynamic_obstacle_time": d_star_dynamic_obstacle_time,
+    "map_solution_time": map_solution_time
+  }
+
+  if verbose:
+    printMapSummary(result, rrt_step_size)
+
+  print(f"Execution completed for Map {map_number}!")
+  print()
+
+  return result
+
+def printMapSummary(result: dict, rrt_step_size: int) -> None:
+  """
+  Prints the path lengths and execution times of a map.
+
+  @param result: The result of processMap() for the map
+  @param rrt_step_size: The step size for the RRT algorithm
+  """
+
+  if result["d_star_initial_time"] != 0:
+
+    if result["d_star_initial_path_length"] != 0:
+      print(f"D* Initial Solution Path Length: {result['d_star_initial_path_length']}")
+    else:
+      print("No D* initial solution path found.")
+
+    print(f"D* Initial Execution Time: {round(result['d_star_initial_time'], 6)} seconds")
+
+  if result["rrt_initial_time"] != 0:
+
+    if result["rrt_initial_path_length"] != 0:
+      print(f"RRT Initial Solution Path Length: {result['rrt_initial_path_length']} (RRT step size = {rrt_step_size})")
+    else:
+      print("No RRT initial solution path found.")
+
+    print(f"RRT Initial Execution Time: {round(result['rrt_initial_time'], 6)} seconds")
+
+  if result["rrt_replanning_time"] != 0:
+
+    if result["rrt_replanning_path_length"] != 0:
+      print(f"RRT Replanning Solution Path Length: {result['rrt_replanning_path_length']} (RRT step size = {rrt_step_size})")
+    else:
+      print("No RRT replanning solution path found.")
+
+    print(f"RRT Replanning Execution Time: {round(result['rrt_replanning_time'], 6)} seconds")
+
+  if result["d_star_dynamic_obstacle_time"] != 0:
+
+    if result["d_star_dynamic_obstacle_path_length"] != 0:
+      print(f"D* Dynamic Obstacle Solution Path Length: {result['d_star_dynamic_obstacle_path_length']}")
+    else:
+      print("No D* dynamic obstacle solution path found.")
+
+    print(f"D* Dynamic Obstacle Execution Time: {round(result['d_star_dynamic_obstacle_time'], 6)} seconds")
+
+  print(f"Map {result['map_number']} Solution Time: {round(result['map_solution_time'], 6)} seconds")
+
+def toCellPath(path: list) -> list:
+  """
+  Converts a path of waypoints into the list of (x, y) cells it passes
+  through. A path of neighboring cells is returned unchanged.
+
+  @param path: The (x, y) waypoints of the path
+  @return: The (x, y) cells of the path
+  """
+
+  return [(x, y) for x, y in expandPath(path).tolist()]
+
+def initializeWorker(save_images: str, profiling_arguments: tuple = ()) -> None:
+  """
+  Prepares a map worker process. Workers never open windows and save their
+  images synchronously, since the other workers already overlap with disk I/O.
+
+  @param save_images: Which images to save: "all", "solutions" or "none"
+  @param profiling_arguments: The positional arguments for configureProfiling() (default is no profiling)
+  """
+
+  configureImageOutput(True, save_images, 0)
+  configureProfiling(*profiling_arguments)
+
+def recordMap(map_arguments: tuple, metrics: Metrics) -> dict:
+  """
+  Runs processMap() while recording its phase timings and counters, and adds
+  the metrics record to its result.
+
+  @param map_arguments: The positional arguments for processMap()
+  @param metrics: The metrics of the map (e.g. with its map generation span already recorded)
+  @return: The result of processMap(), with the metrics record under "metrics"
+  """
+
+  with recordMetrics(metrics):
+    result = processMap(*map_arguments)
+
+  result["metrics"] = metrics.toRecord()
+
+  return result
+
+def processMapInWorker(map_arguments: tuple, metrics: Metrics) -> tuple:
+  """
+  Runs recordMap() in a worker process, capturing its console output so the
+  parent can print it in map order.
+
+  @param map_arguments: The positional arguments for processMap()
+  @param metrics: The metrics of the map
+  @return: The result of recordMap() and its console output
+  """
+
+  output = io.StringIO()
+
+  with contextlib.redirect_stdout(output):
+    result = recordMap(map_arguments, metrics)
+
+  return result, output.getvalue()
@@ -0,0 +1,30 @@
+import cv2
+import numpy as np
+import random
+
+from maps.clearance_map import ClearanceMap
+from maps.generate_maps import generateMap
+from maps.occupancy_grid import OccupancyGrid
+
+def testWindowedUpdateEqualsFullTransform():
+
+  for seed in range(5):
+    rng = random.Random(seed)
+    map = generateMap(300, 15, rng)
+    grid = OccupancyGrid(map)
+    clearance_map = grid.clearanceMap()
+    # Cached arrays are updated in place
+    blocked = clearance_map.blockedCells(3)
+    penalties = clearance_map.penaltyCosts(2.0)
+
+    # Obstacles in the middle and at the edges of the map
+    for x, y in ((rng.randrange(300), rng.randrange(300)), (0, 150), (299, 299)):
+      radius = rng.randint(3, 20)
+      cv2.circle(map, (x, y), radius, (0, 0, 0), -1)
+      grid.syncRegion(map, (x - radius, y - radius, x + radius, y + radius))
+
+    full_clearance_map = ClearanceMap(grid)
+
+    assert np.array_equal(clearance_map.distances, full_clearance_map.distances)
+    assert np.array_equal(blocked, full_clearance_map.blockedCells(3))
+    assert np.allclose(penalties, full_clearance_map.penaltyCosts(2.0))
@@ -0,0 +1,60 @@
+import random
+
+from algorithms.d_star_lite import DStarLite
+from algorithms.grid_search import searchGrid
+from maps.generate_maps import generateDynamicObstacle, generateMap
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.points import selectInitialPoints
+
+def isGridPath(grid: OccupancyGrid, path: list) -> bool:
+  """
+  Checks if a path only takes 4-connected steps between free cells.
+
+  @param grid: The occupancy grid of the map
+  @param path: The (x, y) points of the path
+  @return: True if the path is a 4-connected path through free space, False otherwise
+  """
+
+  return all(grid.cells[y, x] == 0 for x, y in path) and all(
+    abs(x1 - x2) + abs(y1 - y2) == 1
+    for (x1, y1), (x2, y2) in zip(path, path[1:])
+  )
+
+def testInitialSearchExpandsLikeSearchGrid():
+
+  for seed in range(10):
+    rng = random.Random(seed)
+    map = generateMap(200, 15, rng)
+    grid = OccupancyGrid(map)
+    start, goal = selectInitialPoints(grid, rng=rng)
+    planner = DStarLite(grid, start, goal)
+    planner.computeShortestPath()
+
+    # Ties are broken like searchGrid(), which stops before expanding the goal
+    assert planner.expansions == searchGrid(grid, start, goal)[1] + 1
+
+def testRepairedPathCostEqualsFreshSearch():
+
+  for seed in range(10):
+    rng = random.Random(seed)
+    map = generateMap(200, 15, rng)
+    grid = OccupancyGrid(map)
+    start, goal = selectInitialPoints(grid, rng=rng)
+    planner = DStarLite(grid, start, goal)
+    planner.computeShortestPath()
+    path = planner.extractPath()
+
+    assert len(path) == len(searchGrid(grid, start, goal)[0])
+
+    changed_cells, _ = generateDynamicObstacle(LayeredMap(map), grid, path, 3, rng=rng)
+    planner.updateCells(changed_cells)
+    planner.computeShortestPath()
+    repaired_path = planner.extractPath()
+
+    assert len(repaired_path) == len(searchGrid(grid, start, goal)[0])
+    assert repaired_path == [] or (
+      repaired_path[0] == planner.start
+      and repaired_path[-1] == planner.goal
+      and isGridPath(grid, repaired_path)
+    )
@@ -0,0 +1,65 @@
+import numpy as np
+import random
+import re
+
+from maps.generate_maps import generateDynamicObstacle, generateMap
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+
+def createShortPathMap(seed: int, number_obstacles: int = 0) -> tuple:
+  """
+  Creates a map with a short straight path, so the dynamic obstacles placed
+  along it overlap each other and reach the start and goal points.
+
+  @param seed: The seed of the map and of the dynamic obstacles
+  @param number_obstacles: The number of initial obstacles (default is 0)
+  @return: The layered map, its occupancy grid, the path and the random number generator
+  """
+
+  rng = random.Random(seed)
+  map = generateMap(400, number_obstacles, rng)
+  path = [(x, 200) for x in range(180, 221)]
+  # Paths only cross free space
+  map[200, 180:221] = 255
+
+  return LayeredMap(map), OccupancyGrid(map), path, rng
+
+def testDynamicObstaclesKeepStartAndGoalFree():
+
+  for seed in range(20):
+    map, grid, path, rng = createShortPathMap(seed)
+    generateDynamicObstacle(map, grid, path, 5, rng=rng)
+
+    assert grid.cells[path[0][1], path[0][0]] == 0
+    assert grid.cells[path[-1][1], path[-1][0]] == 0
+
+def testDynamicObstaclesReturnChangedCells():
+
+  for seed in range(20):
+    map, grid, path, rng = createShortPathMap(seed, 20)
+    cells = grid.cells.copy()
+    changed_cells, _ = generateDynamicObstacle(map, grid, path, 5, rng=rng)
+    # (x, y) coordinates of the cells that differ, sorted by x and then y
+    expected_cells = np.argwhere((grid.cells != cells).T)
+
+    assert np.array_equal(changed_cells, expected_cells)
+    assert grid.cells[changed_cells[:, 1], changed_cells[:, 0]].all()
+
+def testDynamicObstaclesReturnCoveredPathPositions(capsys):
+
+  for seed in range(10):
+    map, grid, path, rng = createShortPathMap(seed, 20)
+    # The path goes back to its start, so every cell but the last one is
+    # visited twice
+    path = path + path[-2::-1]
+    _, covered_positions = generateDynamicObstacle(map, grid, path, 5, True, rng)
+    output = capsys.readouterr().out
+    covered_counts = re.findall(r"covered by dynamic obstacle \d+: (\d+)", output)
+    total_covered = re.search(r"covered by new dynamic obstacles: (\d+)", output)
+    expected_positions = np.flatnonzero([grid.cells[y, x] != 0 for x, y in path])
+
+    assert np.array_equal(covered_positions, expected_positions)
+    assert len(covered_counts) == 5
+    # Each covered path point is counted once, by the first obstacle on it
+    assert sum(int(count) for count in covered_counts) == len(covered_positions)
+    assert int(total_covered.group(1)) == len(covered_positions)
@@ -0,0 +1,55 @@
+import numpy as np
+import random
+
+from algorithms.grid_search import searchGrid
+from algorithms.hpa_star import HPAStar
+from maps.generate_maps import generateDynamicObstacle, generateMap
+from maps.layered_map import LayeredMap
+from maps.occupancy_grid import OccupancyGrid
+from utils.points import selectInitialPoints
+
+def testUpdatedGraphEqualsRebuild():
+
+  for seed, cluster_size, robot_radius in (
+    (0, 16, 0),
+    (1, 32, 0),
+    (2, 20, 0),
+    (3, 16, 2),
+    (4, 32, 2)
+  ):
+    rng = random.Random(seed)
+    map = generateMap(200, 15, rng)
+    grid = OccupancyGrid(map)
+    start, goal = selectInitialPoints(grid, rng=rng, robot_radius=robot_radius)
+    planner = HPAStar(grid, cluster_size, robot_radius)
+    path = planner.findPath(start, goal)
+    changed_cells, _ = generateDynamicObstacle(LayeredMap(map), grid, path, 3, rng=rng)
+    planner.updateCells(changed_cells)
+    rebuilt_planner = HPAStar(grid, cluster_size, robot_radius)
+
+    assert planner.transitions == rebuilt_planner.transitions
+    assert planner.edges == rebuilt_planner.edges
+    assert np.array_equal(planner.obstacle_free, rebuilt_planner.obstacle_free)
+
+def testPathsAreValidAndNearOptimal():
+  rng = random.Random(0)
+  map = generateMap(200, 15, rng)
+  grid = OccupancyGrid(map)
+  planner = HPAStar(grid, 16)
+
+  for _ in range(20):
+    start, goal = selectInitialPoints(grid, rng=rng)
+    path = planner.findPath(start, goal)
+    optimal_path = searchGrid(grid, start, goal)[0]
+
+    assert (len(path) == 0) == (len(optimal_path) == 0)
+
+    if len(path) != 0:
+      assert path[0] == tuple(start) and path[-1] == tuple(goal)
+      assert all(grid.cells[y, x] == 0 for x, y in path)
+      assert all(
+        abs(x1 - x2) + abs(y1 - y2) == 1
+        for (x1, y1), (x2, y2) in zip(path, path[1:])
+      )
+      # Abstract paths are close to, but not always, the shortest paths
+      assert len(optimal_path) <= len(path) <= 1.5 * len(optimal_path)
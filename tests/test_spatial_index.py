@@ -0,0 +1,45 @@
+import random
+
+from utils.spatial_index import BucketGrid
+
+def squaredDistance(point1: tuple, point2: tuple) -> float:
+  """
+  Finds the squared Euclidean distance between two points.
+
+  @param point1: The first point
+  @param point2: The second point
+  @return: The squared distance between the points
+  """
+
+  return (point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2
+
+def testQueriesEqualBruteForce():
+  rng = random.Random(0)
+
+  for bucket_size in (1, 7, 20, 500):
+    index = BucketGrid(400, 400, bucket_size)
+    points = []
+
+    assert index.nearest((10, 10)) is None
+
+    # Points clustered in one corner, so many queries start outside the
+    # occupied buckets
+    for value in range(300):
+      point = (rng.randrange(150), rng.randrange(150))
+      index.insert(point, value)
+      points.append(point)
+
+    assert len(index) == len(points)
+
+    for _ in range(100):
+      query = (rng.uniform(0, 399), rng.uniform(0, 399))
+      nearest_distance = min(squaredDistance(point, query) for point in points)
+      radius = rng.uniform(0, 60)
+
+      # Ties may return any of the nearest points
+      assert squaredDistance(points[index.nearest(query)], query) == nearest_distance
+      assert sorted(index.withinRadius(query, radius)) == [
+        value
+        for value, point in enumerate(points)
+        if squaredDistance(point, query) < radius ** 2
+      ]
@@ -1,5 +1,6 @@
 import argparse
 import math
+import os
 
 def parseArgs() -> argparse.Namespace:
   """
@@ -10,20 +11,102 @@ def parseArgs() -> argparse.Namespace:
   
   # Parse command line arguments
   parser = argparse.ArgumentParser()
+  parser.add_argument('-a', '--anytime', help='Whether or not the planners improve their first path until their time budget runs out (requires --time_budget)', type=parseBool, default=False)
+  parser.add_argument('-cs', '--cluster_size', help='The length and width of the HPA* clusters, in pixels (min=8; max=map_size)', type=int, default=32)
+  parser.add_argument('-cw', '--clearance_weight', help='The extra cost of a D* path cell next to an obstacle, relative to a move, falling to 0 at 32 pixels of clearance (4- / 8-connected D* planners only; min=0)', type=float, default=0)
+  parser.add_argument('-dp', '--d_star_planner', help='The D* planner (lite = incremental 4-connected D* Lite; hpa = hierarchical 4-connected HPA*; 4 / 8 = 4- / 8-connected grid search; theta = any-angle Theta*)', choices=['lite', 'hpa', '4', '8', 'theta'], default='lite')
+  parser.add_argument('-hl', '--headless', help='Whether or not to run without opening map windows', type=parseBool, default=False)
+  parser.add_argument('-iwt', '--image_writer_threads', help='The number of background threads that save map images (0 = save synchronously; max=32)', type=int, default=2)
+  parser.add_argument('-mo', '--metrics_output', help='The JSONL file to save the phase timings and planner counters of each map to (default=not saved)', type=str, default=None)
   parser.add_argument('-ms', '--map_size', help='The length and width of the map, in pixels (min=100; max=1000)', type=int, default=800)
   parser.add_argument('-ndo', '--num_dynamic_obstacles', help='The number of dynamic obstacles to generate on the solution path (min=1; max=0.5%% of map_size)', type=int, default=4)
   parser.add_argument('-nio', '--num_initial_obstacles', help='The number of initial obstacles to generate (min=1; max=5%% of map_size)', type=int, default=40)
   parser.add_argument('-nm', '--num_maps', help='The number of maps to generate', type=int, default=1)
-  parser.add_argument('-rmi', '--rrt_max_iterations', help='The maximum iterations for the RRT algorithm (min=1,000; max=8,000)', type=int, default=4000)
+  parser.add_argument('-pm', '--profile_maps', help='The numbers of the maps to profile (default=every map)', type=int, nargs='+', default=None)
+  parser.add_argument('-po', '--profile_output', help='The folder to save the profiles in', type=str, default='./ai_robotics_final_project/profiles')
+  parser.add_argument('-pr', '--profiler', help='The profiler to run around the profiled stages (cprofile = .prof call profiles; tracemalloc = peak memory and top allocation sites; both)', choices=['cprofile', 'tracemalloc', 'both'], default=None)
+  parser.add_argument('-ps', '--profile_stages', help='The pipeline stages to profile (default=every stage)', choices=['map_generation', 'point_selection', 'd_star_initial', 'rrt_initial', 'dynamic_obstacles', 'rrt_replanning', 'd_star_dynamic_obstacle', 'rendering', 'io'], nargs='+', default=None)
+  parser.add_argument('-pt', '--profile_top', help='The number of allocation sites in each tracemalloc report (min=1)', type=int, default=20)
+  parser.add_argument('-rgb', '--rrt_goal_bias', help='The probability of the RRT sampling the goal (or the path to reconnect to) instead of free space (min=0; max=1)', type=float, default=0.05)
+  parser.add_argument('-rm', '--replay_map', help='Only run the map with this number from a seeded run (requires --seed)', type=int, default=None)
+  parser.add_argument('-rmi', '--rrt_max_iterations', help='The maximum iterations for the RRT algorithm (min=1,000; max=500,000)', type=int, default=4000)
+  parser.add_argument('-rp', '--rrt_planner', help='The RRT planner of the initial solution and of replanning (rrt = single-tree RRT; connect = bidirectional RRT-Connect)', choices=['rrt', 'connect'], default='rrt')
+  parser.add_argument('-rr', '--robot_radius', help='The radius of the robot, in pixels; paths keep this clearance from obstacles (not supported by D* Lite; min=0; max=1%% of map_size)', type=int, default=0)
   parser.add_argument('-rss', '--rrt_step_size', help='The step size for the RRT algorithm (min=1; max=1%% of map_size)', type=int, default=8)
   parser.add_argument('-rt', '--replanning_threshold', help='The replanning encountered obstacle threshold for the D* algorithm (min=1; max=0.5%% of map_size)', type=int, default=4)
-  parser.add_argument('-v', '--verbose', help='Whether or not to print more detailed output in the console', type=bool, default=False)
+  parser.add_argument('-s', '--seed', help='The seed of the run; each map gets its own random stream derived from it (default=a random seed, which is printed)', type=int, default=None)
+  parser.add_argument('-si', '--save_images', help='Which map images to save (all; solutions = skip intermediate map snapshots; none)', choices=['all', 'solutions', 'none'], default='all')
+  parser.add_argument('-tb', '--time_budget', help='The seconds each planner run may take before it returns its best path so far (not supported by D* Lite or HPA*; min=0.001)', type=float, default=None)
+  parser.add_argument('-v', '--verbose', help='Whether or not to print more detailed output in the console', type=parseBool, default=False)
+  parser.add_argument('-w', '--workers', help='The number of processes that run maps in parallel (min=1; max=number of CPU cores)', type=int, default=1)
   args = parser.parse_args()
   # Validate args and adjust, if necessary
   validateArgs(args)
 
   return args
 
+def parseBenchmarkArgs() -> argparse.Namespace:
+  """
+  Parse and validate the benchmark command line arguments.
+
+  @return: The parsed and validated benchmark command line arguments.
+  """
+
+  parser = argparse.ArgumentParser()
+  subparsers = parser.add_subparsers(dest='command', required=True)
+  run_parser = subparsers.add_parser('run', help='Run a benchmark scenario set and save the results as JSON and CSV')
+  run_parser.add_argument('-cs', '--cluster_size', help='The length and width of the HPA* clusters, in pixels (min=8)', type=int, default=32)
+  run_parser.add_argument('-dp', '--d_star_planner', help='The D* planner to time (lite = incremental 4-connected D* Lite; hpa = hierarchical 4-connected HPA*; 4 / 8 = 4- / 8-connected grid search; theta = any-angle Theta*)', choices=['lite', 'hpa', '4', '8', 'theta'], default='4')
+  run_parser.add_argument('-o', '--output', help='The path of the result files, without an extension (default=benchmarks/results/benchmark_<date and time>)', type=str, default=None)
+  run_parser.add_argument('-r', '--repeats', help='The number of timed runs of each scenario (min=1)', type=int, default=5)
+  run_parser.add_argument('-rp', '--rrt_planner', help='The RRT planner to time in the rrt and replanning stages (rrt = single-tree RRT; connect = bidirectional RRT-Connect)', choices=['rrt', 'connect'], default='rrt')
+  run_parser.add_argument('-ss', '--scenario_set', help='The scenario set to run (quick; standard = map sizes 200/400/800, sparse/dense obstacles, small/large RRT steps)', choices=['quick', 'standard'], default='standard')
+  run_parser.add_argument('-wu', '--warmup', help='The number of untimed runs of each scenario before the timed runs (min=0)', type=int, default=1)
+  compare_parser = subparsers.add_parser('compare', help='Compare two JSON result files and flag regressions')
+  compare_parser.add_argument('baseline', help='The baseline JSON result file', type=str)
+  compare_parser.add_argument('candidate', help='The candidate JSON result file', type=str)
+  compare_parser.add_argument('-t', '--threshold', help='The allowed slowdown of a stage median, as a fraction (default=0.1, i.e. 10%%)', type=float, default=0.1)
+  args = parser.parse_args()
+
+  if args.command == 'run':
+
+    if args.repeats < 1:
+      args.repeats = 1
+
+      print("Number of repeats is too small. Using minimum value of 1.")
+
+    if args.warmup < 0:
+      args.warmup = 0
+
+      print("Number of warmup runs is too small. Using minimum value of 0.")
+
+    if args.cluster_size < 8:
+      args.cluster_size = 8
+
+      print("Cluster size is too small. Using minimum value of 8.")
+
+  elif args.threshold < 0:
+    args.threshold = 0
+
+    print("Regression threshold is too small. Using minimum value of 0.")
+
+  return args
+
+def parseBool(value: str) -> bool:
+  """
+  Parse a True/False command line value.
+
+  @param value: The command line value
+  @return: The parsed boolean
+  """
+
+  if value.lower() in ("true", "t", "yes", "y", "1"):
+    return True
+  elif value.lower() in ("false", "f", "no", "n", "0"):
+    return False
+
+  raise argparse.ArgumentTypeError(f"Expected True or False, got '{value}'.")
+
 def validateArgs(args: argparse.Namespace) -> None:
   """
   Validate the command line arguments, adjusting them if necessary.
@@ -33,6 +116,21 @@ def validateArgs(args: argparse.Namespace) -> None:
 
   print()
   print("Validating arguments...")
+
+  if args.clearance_weight < 0:
+    args.clearance_weight = 0
+
+    print("Clearance weight is too small. Using minimum value of 0.")
+
+  if args.image_writer_threads < 0:
+    args.image_writer_threads = 0
+
+    print("Number of image writer threads is too small. Using minimum value of 0.")
+
+  elif args.image_writer_threads > 32:
+    args.image_writer_threads = 32
+
+    print("Number of image writer threads is too large. Using maximum value of 32.")
   
   if args.map_size < 100:
     args.map_size = 100
@@ -71,16 +169,101 @@ def validateArgs(args: argparse.Namespace) -> None:
 
     print("Number of initial obstacles is too large. Using maximum value of 5%% of map size (" + str(num_initial_obstacles) + ").")
 
+  if args.profile_top < 1:
+    args.profile_top = 1
+
+    print("Number of profiled allocation sites is too small. Using minimum value of 1.")
+
+  if args.profiler is None and (
+    args.profile_stages is not None or args.profile_maps is not None
+  ):
+    print("No profiler was chosen. Profiled stages and maps are ignored.")
+
+  if args.rrt_goal_bias < 0:
+    args.rrt_goal_bias = 0
+
+    print("RRT goal bias is too small. Using minimum value of 0.")
+
+  elif args.rrt_goal_bias > 1:
+    args.rrt_goal_bias = 1
+
+    print("RRT goal bias is too large. Using maximum value of 1.")
+
+  if args.replay_map is not None:
+
+    if args.seed is None:
+      args.replay_map = None
+
+      print("A seed is required to replay a map. Running all maps.")
+
+    elif args.replay_map < 1:
+      args.replay_map = 1
+
+      print("Replay map number is too small. Using minimum value of 1.")
+
+  if args.robot_radius < 0:
+    args.robot_radius = 0
+
+    print("Robot radius is too small. Using minimum value of 0.")
+
+  elif args.robot_radius > args.map_size * 0.01:
+    robot_radius = math.floor(args.map_size * 0.01)
+    args.robot_radius = robot_radius
+
+    print("Robot radius is too large. Using maximum value of 1%% of map size (" + str(robot_radius) + ").")
+
+  if args.d_star_planner == "lite" and (
+    args.robot_radius > 0 or args.clearance_weight > 0
+  ):
+    args.d_star_planner = "4"
+
+    print("D* Lite plans for a point robot. Using the 4-connected D* planner.")
+
+  if args.d_star_planner == "hpa" and args.clearance_weight > 0:
+    args.d_star_planner = "4"
+
+    print("HPA* has no clearance costs. Using the 4-connected D* planner.")
+
+  if args.time_budget is not None and args.time_budget < 0.001:
+    args.time_budget = 0.001
+
+    print("Time budget is too small. Using minimum value of 0.001 seconds.")
+
+  if args.anytime and args.time_budget is None:
+    args.anytime = False
+
+    print("Anytime planning requires a time budget. Returning the first path found.")
+
+  if args.d_star_planner == "lite" and args.time_budget is not None:
+    args.d_star_planner = "4"
+
+    print("D* Lite has no time budget. Using the 4-connected D* planner.")
+
+  if args.d_star_planner == "hpa" and args.time_budget is not None:
+    args.d_star_planner = "4"
+
+    print("HPA* has no time budget. Using the 4-connected D* planner.")
+
+  if args.cluster_size < 8:
+    args.cluster_size = 8
+
+    print("Cluster size is too small. Using minimum value of 8.")
+
+  elif args.cluster_size > args.map_size:
+    args.cluster_size = args.map_size
+
+    print("Cluster size is too large. Using maximum value of map size (" + str(args.map_size) + ").")
+
   if args.rrt_max_iterations < 1000:
     args.rrt_max_iterations = 1000
 
     print("RRT max iterations is too small. Using minimum value of 1000.")
 
-  elif args.rrt_max_iterations > 8000:
-    rrt_max_iterations = 8000
+  elif args.rrt_max_iterations > 500000:
+    rrt_max_iterations = 500000
     args.rrt_max_iterations = rrt_max_iterations
 
-    print("RRT max iterations is too large. Using maximum value of 8,000.")
+    print("RRT max iterations is too large. Using maximum value of 500,000.")
 
   if args.rrt_step_size < 1:
     args.rrt_step_size = 1
@@ -109,5 +292,22 @@ def validateArgs(args: argparse.Namespace) -> None:
     else:
       print("Replanning threshold is too large. Using maximum value of 0.5%% of map size (" + str(replanning_threshold) + ").")
 
+  max_workers = os.cpu_count() or 1
+
+  if args.workers < 1:
+    args.workers = 1
+
+    print("Number of workers is too small. Using minimum value of 1.")
+
+  elif args.workers > max_workers:
+    args.workers = max_workers
+
+    print("Number of workers is too large. Using maximum value of the number of CPU cores (" + str(max_workers) + ").")
+
+  if args.workers > 1 and not args.headless:
+    args.headless = True
+
+    print("Map windows cannot be opened from worker processes. Running in headless mode.")
+
   print("Arguments validated successfully!")
   print()
@@ -0,0 +1,32 @@
+import time
+
+# Statuses returned by the planners with their paths: the path is the best
+# the planner can find, a path was found but may not be the best, the
+# deadline passed before a path was found, or the planner gave up without one
+optimal = "optimal"
+feasible = "feasible"
+timeout = "timeout"
+no_path = "no_path"
+
+def createDeadline(time_budget: float = None) -> float:
+  """
+  Creates a wall-clock deadline a time budget from now.
+
+  @param time_budget: The time budget, in seconds (default is None, no deadline)
+  @return: The deadline, as a time.time() value, or None if there is no budget
+  """
+
+  if time_budget is None:
+    return None
+
+  return time.time() + time_budget
+
+def isExpired(deadline: float = None) -> bool:
+  """
+  Checks if a deadline has passed.
+
+  @param deadline: The deadline, as a time.time() value (default is None, no deadline)
+  @return: True if the deadline has passed, False otherwise
+  """
+
+  return deadline is not None and time.time() >= deadline
@@ -0,0 +1,152 @@
+import contextlib
+import json
+import sys
+import time
+
+sys.path.append('./ai_robotics_final_project')
+
+from utils.profiling import profileStage
+
+# The metrics that span() and count() record to; set with recordMetrics()
+active_metrics = {
+  "metrics": None
+}
+
+class Metrics:
+  """
+  Phase timings and hot-path counters of one map (or any other unit of
+  work), exportable as one JSON line.
+
+  Phases are timed as spans with time.perf_counter(), a monotonic clock, and
+  may nest (e.g. rendering inside a planner phase). Counters are totals the
+  planners add once per run (cells expanded, heap pushes, collision
+  checks...), so the hot loops only increment local variables.
+  """
+
+  def __init__(self, **fields) -> None:
+    """
+    Creates empty metrics.
+
+    @param fields: Fields that identify the metrics in the export (e.g. map_number)
+    """
+
+    self.fields = fields
+    self.origin = time.perf_counter()
+    self.spans = []
+    self.counters = {}
+
+  def count(self, name: str, amount: int = 1) -> None:
+    """
+    Adds to a counter.
+
+    @param name: The name of the counter, prefixed with the planner (e.g. "rrt.samples")
+    @param amount: The amount to add (default is 1)
+    """
+
+    self.counters[name] = self.counters.get(name, 0) + amount
+
+  def phaseSeconds(self) -> dict:
+    """
+    Totals the spans of each phase.
+
+    @return: The seconds spent in each phase, by phase name
+    """
+
+    phase_seconds = {}
+
+    for span in self.spans:
+      phase = span["phase"]
+      phase_seconds[phase] = phase_seconds.get(phase, 0) + span["seconds"]
+
+    return phase_seconds
+
+  def toRecord(self) -> dict:
+    """
+    Gets the metrics as a JSON-serializable record.
+
+    @return: The fields, spans (start offsets and durations, in seconds), phase totals and counters
+    """
+
+    return {
+      **self.fields,
+      "spans": self.spans,
+      "phase_seconds": self.phaseSeconds(),
+      "counters": dict(sorted(self.counters.items()))
+    }
+
+@contextlib.contextmanager
+def recordMetrics(metrics: Metrics):
+  """
+  Makes span() and count() record to the provided metrics, until the block
+  exits.
+
+  @param metrics: The metrics to record to, or None to stop recording
+  @return: The metrics
+  """
+
+  previous = active_metrics["metrics"]
+  active_metrics["metrics"] = metrics
+
+  try:
+    yield metrics
+  finally:
+    active_metrics["metrics"] = previous
+
+@contextlib.contextmanager
+def span(phase: str):
+  """
+  Times a block as a span of a phase. The span is timed even when no metrics
+  are being recorded, so callers can read its duration. If the phase of the
+  map is profiled (see configureProfiling()), the block is also profiled,
+  outside the span, so saving the profiles is not timed.
+
+  @param phase: The name of the phase
+  @return: The span, whose "seconds" are set when the block exits
+  """
+
+  metrics = active_metrics["metrics"]
+  map_number = metrics.fields.get("map_number") if metrics is not None else None
+
+  with profileStage(phase, map_number):
+    start_time = time.perf_counter()
+    timed_span = {
+      "phase": phase,
+      "start": start_time - metrics.origin if metrics is not None else 0.0,
+      "seconds": 0.0
+    }
+
+    try:
+      yield timed_span
+    finally:
+      timed_span["seconds"] = time.perf_counter() - start_time
+
+      if metrics is not None:
+        metrics.spans.append(timed_span)
+
+def count(name: str, amount: int = 1) -> None:
+  """
+  Adds to a counter of the metrics being recorded, if any.
+
+  @param name: The name of the counter, prefixed with the planner (e.g. "rrt.samples")
+  @param amount: The amount to add (default is 1)
+  """
+
+  metrics = active_metrics["metrics"]
+
+  if metrics is not None:
+    metrics.count(name, amount)
+
+def writeMetrics(records: list, output_path: str) -> None:
+  """
+  Writes metrics records as JSON Lines, one record per line.
+
+  @param records: The records, from Metrics.toRecord()
+  @param output_path: The path of the JSONL file
+  """
+
+  with open(output_path, "w") as file:
+
+    for record in records:
+      file.write(json.dumps(record) + "\n")
+
+  print(f"Metrics saved to {output_path}")
@@ -1,148 +1,305 @@
-import cv2
 import math
 import numpy as np
 import random
+import sys
 
-def clearPaths(
-  map: list,
-  start: cv2.typing.Point,
-  goal: cv2.typing.Point,
-  verbose: bool = False
-) -> None:
+sys.path.append('./ai_robotics_final_project')
+
+from maps.layered_map import LayeredMap, path_layers
+from maps.occupancy_grid import OccupancyGrid
+from utils.metrics import span
+
+# Number of start/goal pairs drawn before falling back to picking the goal
+# from the component of the start
+initial_point_attempts = 100
+
+def areCollisionFree(
+  grid: OccupancyGrid,
+  starts: np.ndarray,
+  ends: np.ndarray,
+  robot_radius: float = 0
+) -> np.ndarray:
   """
-  Clears paths from the provided map.
+  Checks many line segments for collisions at once. Every cell covered by the
+  segments is read from the occupancy grid in a single vectorized lookup.
 
-  @param map: The map image with obstacles
-  @param start: The start point
-  @param goal: The goal point
+  @param grid: The occupancy grid of the map
+  @param starts: The (x, y) start points of the segments, as an Nx2 array
+  @param ends: The (x, y) end points of the segments, as an Nx2 array
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @return: A boolean array, True for each segment that is collision-free
+  """
+
+  xs, ys, segments = rasterizeSegments(starts, ends)
+  number_segments = len(np.asarray(starts).reshape(-1, 2))
+  in_bounds = (xs >= 0) & (xs < grid.width) & (ys >= 0) & (ys < grid.height)
+  # Cells outside the map count as collisions
+  collisions = ~in_bounds
+  collisions[in_bounds] = blockedCells(grid, robot_radius)[
+    ys[in_bounds] * grid.width + xs[in_bounds]
+  ] != 0
+
+  return np.bincount(
+    segments[collisions],
+    minlength=number_segments
+  ) == 0
+
+def blockedCells(grid: OccupancyGrid, robot_radius: float = 0) -> np.ndarray:
+  """
+  Gets the cells a robot does not fit on: the obstacles for a point robot,
+  or the obstacles inflated by the robot radius.
+
+  @param grid: The occupancy grid of the map
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
+  @return: The flat (row-major) cells, where 1 is blocked and 0 is free
+  """
+
+  if robot_radius > 0:
+    return grid.clearanceMap().blockedCells(robot_radius)
+
+  return grid.flat
+
+def clearPaths(map: LayeredMap, verbose: bool = False) -> None:
+  """
+  Clears paths from the provided map. The paths are drawn on their own
+  layers, so the start and goal points and the obstacles are kept.
+
+  @param map: The layered map
   @param verbose: Whether or not to print verbose output (default is False)
   """
 
   if verbose:
     print("Clearing paths from map...")
 
-  # Clear path by setting all red pixels to white
-  map[np.all(map == [0, 0, 255], axis=-1)] = [255, 255, 255]
-  # Clear path by setting all orange pixels to white
-  map[np.all(map == [0, 155, 255], axis=-1)] = [255, 255, 255]
-  # Clear path by setting all light blue pixels to white
-  map[np.all(map == [255, 155, 0], axis=-1)] = [255, 255, 255]
-  # Clear path by setting all purple pixels to white
-  map[np.all(map == [255, 0, 255], axis=-1)] = [255, 255, 255]
-  # Redraw start and goal points
-  drawInitialPoints(map, start, goal)
+  map.clearLayers(path_layers)
 
   if verbose:
     print("Paths cleared from map successfully!")
 
-def drawInitialPoints(map: list, start: tuple, goal: tuple) -> None:
+def drawInitialPoints(map: LayeredMap, start: tuple, goal: tuple) -> None:
   """
   Draws the start and goal points on the map.
 
-  @param map: The map image with obstacles
+  @param map: The layered map
   @param start: The start point
   @param goal: The goal point
   """
 
   # Draw start point in green
-  cv2.circle(map, (start[0], start[1]), 10, (0, 255, 0), -1)
+  map.drawCircle("initial_points", start, 10, (0, 255, 0))
   # Draw goal point in blue
-  cv2.circle(map, (goal[0], goal[1]), 10, (255, 0, 0), -1)
+  map.drawCircle("initial_points", goal, 10, (255, 0, 0))
 
 def drawPathPoints(
-  map: list,
+  map: LayeredMap,
+  grid: OccupancyGrid,
   path: list,
   color: tuple,
-  verbose: bool = False
+  verbose: bool = False,
+  layer: str = "d_star"
 ) -> None:
   """
-  Draws the points for the provided path.
+  Draws the points for the provided path. Runs of points outside obstacles
+  are found in one vectorized step and drawn with a single polyline call.
 
-  @param map: The map image with obstacles
-  @param path: The path to draw
+  @param map: The layered map
+  @param grid: The occupancy grid of the map
+  @param path: The (x, y) points of the path to draw, as a list or an Nx2 array
   @param color: The color to draw the path
   @param verbose: Whether or not to print verbose output (default is False)
+  @param layer: The layer to draw the path on (default is "d_star")
   """
 
   if verbose:
     print("Drawing solution path...")
-  
-  previous_point = None
 
-  for point in path:
-    point_color = str(map[(point[1], point[0])])
-    
-    if (
-      point_color == "[255 255 255]" # White = free space
-      or point_color == "[  0 255   0]" # Green = start
-      or point_color == "[255   0   0]" # Blue = goal
-      or point_color == "[  0 155 255]" # Orange = extra RRT path
-    ):
-      
-      if previous_point:
-        # Draw path in provided color
-        cv2.line(map, previous_point, point, color, 1)
-      else:
-        map[(point[1], point[0])] = color
-    
-    previous_point = point
+  points = np.asarray(path, dtype=np.int32).reshape(-1, 2)
+
+  if len(points) == 0:
+    return
 
-def heuristic(a: tuple, b: tuple) -> int:
+  with span("rendering"):
+    free = grid.flat[points[:, 1] * grid.width + points[:, 0]] == 0
+    # First and last positions of each run of free points
+    run_starts = np.flatnonzero(free & ~np.concatenate(([False], free[:-1])))
+    run_ends = np.flatnonzero(free & ~np.concatenate((free[1:], [False])))
+    # Each run is drawn from the point before it, so it joins up with the
+    # path hidden under an obstacle; the first point is repeated to precede
+    # itself
+    points = np.concatenate((points[:1], points))
+    # Draw path in provided color
+    map.drawPolylines(
+      layer,
+      [points[run_start:run_end + 2] for run_start, run_end in zip(run_starts, run_ends)],
+      color
+    )
+
+def expandPath(path: list) -> np.ndarray:
   """
-  Finds the Manhattan distance between two points.
+  Expands a waypoint path (e.g. from Theta*) into the cells it passes
+  through, along the same raster lines as the collision checks. A path of
+  neighboring cells is returned unchanged.
 
-  @param a: The first point
-  @param b: The second point
-  @return: The Manhattan distance between the two points
+  @param path: The (x, y) waypoints of the path, as a list or an Nx2 array
+  @return: The (x, y) cells of the path, as an Nx2 array
   """
 
-  return abs(a[0] - b[0]) + abs(a[1] - b[1])
+  points = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+
+  if len(points) < 2:
+    return points
+
+  xs, ys, segments = rasterizeSegments(points[:-1], points[1:])
+  # Skip the first cell of every segment after the first, which is the last
+  # cell of the segment before it
+  keep = np.ones(len(segments), dtype=bool)
+  keep[1:] = segments[1:] == segments[:-1]
+
+  return np.stack((xs[keep], ys[keep]), axis=1)
 
 # Check if the line between two points intersects obstacles
 def isCollisionFree(
-  map: list,
+  grid: OccupancyGrid,
   point1: tuple,
   point2: tuple,
-  step_size: int = 1
+  robot_radius: float = 0
 ) -> bool:
   """
   Checks if the line between two points is collision-free.
 
-  @param map: The map image with obstacles
+  @param grid: The occupancy grid of the map
   @param point1: The first point
   @param point2: The second point
-  @param step_size: The step size for checking collision (default is 1)
+  @param robot_radius: The radius of the robot, in pixels (default is 0, a point robot)
   @return: True if the line is collision-free, False otherwise
   """
-  
-  line = np.linspace(point1, point2, num=step_size * 10, dtype=int)
 
-  for x, y in line:
+  x1, y1 = int(point1[0]), int(point1[1])
+  x2, y2 = int(point2[0]), int(point2[1])
 
-    if str(map[y][x]) == "[0 0 0]":  # Black pixel indicates obstacle
-      return False
-  
-  return True
+  # Cells outside the map count as collisions; the cells between the end
+  # points stay inside the map
+  if not (
+    0 <= x1 < grid.width and 0 <= y1 < grid.height
+    and 0 <= x2 < grid.width and 0 <= y2 < grid.height
+  ):
+    return False
+
+  # The raster line of rasterizeSegments(), for a single segment
+  steps = max(abs(x2 - x1), abs(y2 - y1))
+  fractions = np.arange(steps + 1) / max(steps, 1)
+  xs = x1 + np.floor(fractions * (x2 - x1) + 0.5).astype(np.int64)
+  ys = y1 + np.floor(fractions * (y2 - y1) + 0.5).astype(np.int64)
 
-def selectInitialPoints(map: list, verbose: bool = False) -> tuple:
+  return not blockedCells(grid, robot_radius)[ys * grid.width + xs].any()
+
+def pathCost(path: list) -> float:
+  """
+  Finds the Euclidean length of a path.
+
+  @param path: The (x, y) points of the path, as a list or an Nx2 array
+  @return: The sum of the distances between consecutive points
+  """
+
+  points = np.asarray(path, dtype=np.float64).reshape(-1, 2)
+
+  return float(np.hypot(*np.diff(points, axis=0).T).sum())
+
+def rasterizeSegments(starts: np.ndarray, ends: np.ndarray) -> tuple:
+  """
+  Finds every cell covered by each line segment, using a DDA raster line that
+  takes one cell per step along the major axis (the same cells as Bresenham).
+
+  @param starts: The (x, y) start points of the segments, as an Nx2 array
+  @param ends: The (x, y) end points of the segments, as an Nx2 array
+  @return: The x-coordinates, y-coordinates and segment numbers of the covered cells
+  """
+
+  starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+  ends = np.asarray(ends, dtype=np.int64).reshape(-1, 2)
+  deltas = ends - starts
+  steps = np.abs(deltas).max(axis=1)
+  counts = steps + 1
+  segments = np.repeat(np.arange(len(starts)), counts)
+  # Step number of each cell along its own segment
+  offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+  fractions = offsets / np.maximum(steps, 1)[segments]
+  xs = starts[segments, 0] + np.floor(fractions * deltas[segments, 0] + 0.5).astype(np.int64)
+  ys = starts[segments, 1] + np.floor(fractions * deltas[segments, 1] + 0.5).astype(np.int64)
+
+  return xs, ys, segments
+
+def selectInitialPoints(
+  grid: OccupancyGrid,
+  verbose: bool = False,
+  rng: random.Random = None,
+  robot_radius: float = 0
+) -> tuple:
   """
   Selects random start and goal points in the free (white) spaces of the map.
+  The points are drawn from the same connected component, so a path always
+  exists between them.
 
-  @param map: The map image with obstacles
+  @param grid: The occupancy grid of the map
   @param verbose: Whether or not to print verbose output (default is False)
+  @param rng: The random number generator (default is the global random module)
+  @param robot_radius: The radius of the robot, in pixels; the points are drawn from the cells it fits on (default is 0, a point robot)
   @return: The start and goal points in the map
   """
 
+  if rng is None:
+    rng = random
+
   if verbose:
     print("Randomly selecting start and goal points...")
 
-  # Find all white spaces
-  free_spaces = np.unique(np.argwhere(map == 255)[:,0:2], axis=0)
-  # Remove duplicate arrays
-  free_spaces = np.unique(free_spaces, axis=0)
-  # Swap columns to get (x, y) format
-  free_spaces[:, [1, 0]] = free_spaces[:, [0, 1]]
-  start, goal = random.sample(list(free_spaces), 2)
+  if robot_radius > 0:
+    labels = grid.clearanceMap().componentLabels(robot_radius)
+    label_sizes = np.bincount(labels)
+  else:
+    labels = grid.componentLabels()
+    label_sizes = grid.label_sizes
+
+  sampler = grid.freeSpaceSampler()
+  start_cell = -1
+  goal_cell = -1
+
+  # Draw pairs of free cells until both are in the same component, which
+  # usually takes one or two draws since most free space is one component
+  for attempt in range(initial_point_attempts):
+    start_cell = sampler.sampleCell(rng)
+    goal_cell = sampler.sampleCell(rng)
+
+    if start_cell < 0:
+      raise ValueError("The map has no two connected free spaces.")
+
+    if (
+      start_cell != goal_cell
+      and labels[start_cell] != 0
+      and labels[start_cell] == labels[goal_cell]
+    ):
+      break
+
+  else:
+    # Free space is split into many small components; draw the goal from the
+    # component of a start that has at least one other cell to reach
+    start_cells = np.flatnonzero((labels != 0) & (label_sizes[labels] >= 2))
+
+    if len(start_cells) == 0:
+      raise ValueError("The map has no two connected free spaces.")
+
+    start_cell = start_cells[rng.randrange(len(start_cells))]
+    goal_cells = np.flatnonzero(labels == labels[start_cell])
+    # Draw from the other cells of the component, skipping over the start
+    goal_position = rng.randrange(len(goal_cells) - 1)
+
+    if goal_position >= np.searchsorted(goal_cells, start_cell):
+      goal_position += 1
+
+    goal_cell = goal_cells[goal_position]
+
+  start = (int(start_cell % grid.width), int(start_cell // grid.width))
+  goal = (int(goal_cell % grid.width), int(goal_cell // grid.width))
 
   if verbose:
     print("Start point (green): (" + str(start[0]) + ", " + str(start[1]) + ")")
@@ -151,31 +308,52 @@ def selectInitialPoints(map: list, verbose: bool = False) -> tuple:
   print("Start and goal points selected successfully!")
   print()
 
-  return (start[0], start[1]), (goal[0], goal[1])
+  return start, goal
 
-def selectPathPoint(path: list, verbose: bool = False) -> tuple:
+def selectPathPoint(
+  path: list,
+  verbose: bool = False,
+  rng: random.Random = None,
+  covered_positions: np.ndarray = None
+) -> tuple:
   """
-  Selects a random point along the path.
+  Selects a random point along the path. Covered points are skipped, as if
+  they had been removed from the path.
 
   @param path: The path to select a point from
   @param verbose: Whether or not to print verbose output (default is False)
+  @param rng: The random number generator (default is the global random module)
+  @param covered_positions: The sorted positions of the path points to skip (default is None, no points are skipped)
   @return: The selected point
   """
 
+  if rng is None:
+    rng = random
+
+  if covered_positions is None:
+    covered_positions = np.empty(0, dtype=np.intp)
+
   if verbose:
     print("Selecting random point along path...")
 
-  minimum_distance_from_initial_points = math.floor(len(path) * 0.15)
+  path_length = len(path) - len(covered_positions)
+  minimum_distance_from_initial_points = math.floor(path_length * 0.15)
+  end = min(path_length - minimum_distance_from_initial_points + 1, path_length)
   # Select a random point along the path, within the acceptable index range
-  path_point = random.choice(
-    path[
-      minimum_distance_from_initial_points
-      :
-      len(path) - minimum_distance_from_initial_points + 1
-    ]
+  # (the same draw as rng.choice() over that range)
+  rank = minimum_distance_from_initial_points + rng.randrange(
+    end - minimum_distance_from_initial_points
   )
+  # The uncovered point of that rank comes after each k-th covered position
+  # c_k with c_k - k <= rank
+  position = rank + int(np.searchsorted(
+    covered_positions - np.arange(len(covered_positions)),
+    rank,
+    side="right"
+  ))
+  path_point = path[position]
 
   if verbose:
     print("Random point selected: (" + str(path_point[0]) + ", " + str(path_point[1]) + ")")
 
-  return (path_point[0], path_point[1])
+  return (int(path_point[0]), int(path_point[1]))
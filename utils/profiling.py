@@ -0,0 +1,205 @@
+import contextlib
+import cProfile
+import os
+import tracemalloc
+
+# Profiling settings, set once from the command line arguments with
+# configureProfiling(), and the state of the stage being profiled
+profiling = {
+  "profiler": None,
+  "stages": None,
+  "map_numbers": None,
+  "top": 20,
+  "output": "./ai_robotics_final_project/profiles",
+  "active": None,
+  "runs": {}
+}
+
+def configureProfiling(
+  profiler: str = None,
+  stages: list = None,
+  map_numbers: list = None,
+  top: int = 20,
+  output: str = "./ai_robotics_final_project/profiles"
+) -> None:
+  """
+  Configure which pipeline stages are profiled, and how.
+
+  @param profiler: The profiler: "cprofile", "tracemalloc" or "both" (default is None, no profiling)
+  @param stages: The names of the stages (span phases) to profile (default is None, every stage)
+  @param map_numbers: The numbers of the maps to profile (default is None, every map)
+  @param top: The number of allocation sites in each memory report (default is 20)
+  @param output: The folder to save the profiles in (default is ai_robotics_final_project/profiles)
+  """
+
+  profiling["profiler"] = profiler
+  profiling["stages"] = set(stages) if stages is not None else None
+  profiling["map_numbers"] = set(map_numbers) if map_numbers is not None else None
+  profiling["top"] = top
+  profiling["output"] = output
+  profiling["runs"] = {}
+
+  if profiler is not None:
+    os.makedirs(output, exist_ok=True)
+
+def isProfiled(stage: str, map_number: int = None) -> bool:
+  """
+  Checks if a stage of a map is profiled.
+
+  @param stage: The name of the stage
+  @param map_number: The number of the map (default is None, not part of a map)
+  @return: True if the stage is profiled, False otherwise
+  """
+
+  return (
+    profiling["profiler"] is not None
+    and (profiling["stages"] is None or stage in profiling["stages"])
+    and (profiling["map_numbers"] is None or map_number in profiling["map_numbers"])
+  )
+
+@contextlib.contextmanager
+def profileStage(stage: str, map_number: int = None):
+  """
+  Profiles a block as a run of a stage, if the stage of the map is profiled.
+
+  With cProfile, the calls of the block are saved to
+  map<number>_<stage>.prof, for pstats or snakeviz. With tracemalloc, the
+  peak memory and the allocation sites that grew the most are saved to
+  map<number>_<stage>_memory.txt, measured at the end of the block and at
+  each snapshotMemory() call inside it. Later runs of the same stage of a map
+  get a run number suffix. Stages nested in a profiled stage are part of its
+  profile.
+
+  @param stage: The name of the stage
+  @param map_number: The number of the map (default is None, not part of a map)
+  """
+
+  if profiling["active"] is not None or not isProfiled(stage, map_number):
+    yield
+    return
+
+  profiler = profiling["profiler"]
+  profile = None
+  started_tracing = False
+  snapshots = []
+
+  if profiler in ("tracemalloc", "both"):
+    started_tracing = not tracemalloc.is_tracing()
+
+    if started_tracing:
+      tracemalloc.start()
+
+    tracemalloc.reset_peak()
+
+  if profiler in ("cprofile", "both"):
+    profile = cProfile.Profile()
+
+  profiling["active"] = {
+    "snapshots": snapshots,
+    "baseline": takeSnapshot() if tracemalloc.is_tracing() else None,
+    "profile": profile
+  }
+
+  if profile is not None:
+    profile.enable()
+
+  try:
+    yield
+  finally:
+
+    if profile is not None:
+      profile.disable()
+
+    baseline = profiling["active"]["baseline"]
+    peak = 0
+
+    if baseline is not None:
+      snapshots.append(("end of stage", takeSnapshot()))
+      peak = tracemalloc.get_traced_memory()[1]
+
+      if started_tracing:
+        tracemalloc.stop()
+
+    profiling["active"] = None
+    writeProfiles(stage, map_number, profile, baseline, snapshots, peak)
+
+def snapshotMemory(label: str) -> None:
+  """
+  Records the allocations of the stage being profiled with tracemalloc, at a
+  point where a planner's working memory is at its largest (e.g. a full
+  tree, before it is freed on return). Does nothing otherwise.
+
+  @param label: The label of the snapshot in the memory report
+  """
+
+  active = profiling["active"]
+
+  if active is None or active["baseline"] is None:
+    return
+
+  # Keep the snapshot out of the call profile
+  profile = active["profile"]
+
+  if profile is not None:
+    profile.disable()
+
+  active["snapshots"].append((label, takeSnapshot()))
+
+  if profile is not None:
+    profile.enable()
+
+def takeSnapshot() -> tracemalloc.Snapshot:
+  """
+  Takes a tracemalloc snapshot, without the allocations of tracemalloc and
+  the profiler themselves.
+
+  @return: The snapshot
+  """
+
+  return tracemalloc.take_snapshot().filter_traces((
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__)
+  ))
+
+def writeProfiles(
+  stage: str,
+  map_number: int,
+  profile: cProfile.Profile,
+  baseline: tracemalloc.Snapshot,
+  snapshots: list,
+  peak: int
+) -> None:
+  """
+  Saves the profiles of a run of a stage.
+
+  @param stage: The name of the stage
+  @param map_number: The number of the map, or None
+  @param profile: The cProfile profile, or None
+  @param baseline: The tracemalloc snapshot from the start of the stage, or None
+  @param snapshots: The (label, snapshot) tracemalloc snapshots taken during the stage
+  @param peak: The peak traced memory during the stage, in bytes
+  """
+
+  name = f"map{map_number}_{stage}" if map_number is not None else stage
+  runs = profiling["runs"].get(name, 0) + 1
+  profiling["runs"][name] = runs
+
+  if runs > 1:
+    name += f"_{runs}"
+
+  path = os.path.join(profiling["output"], name)
+
+  if profile is not None:
+    profile.dump_stats(path + ".prof")
+
+  if baseline is not None:
+
+    with open(path + "_memory.txt", "w") as file:
+      file.write(f"Peak traced memory: {round(peak / 1024, 1)} KiB\n")
+
+      for label, snapshot in snapshots:
+        file.write("\n")
+        file.write(f"Top {profiling['top']} allocation sites by growth since the start of the stage, at {label}:\n")
+
+        for statistic in snapshot.compare_to(baseline, "lineno")[:profiling["top"]]:
+          file.write(f"{statistic}\n")
@@ -0,0 +1,25 @@
+import random
+
+def createRng(seed: int, *keys) -> random.Random:
+  """
+  Creates a random number generator whose stream is derived from a seed and
+  the provided keys (e.g. a map number and a stage name). Streams with
+  different keys are independent, and the same seed and keys always give the
+  same stream, in any process.
+
+  @param seed: The seed of the run
+  @param keys: The keys that identify the stream
+  @return: The random number generator
+  """
+
+  # String seeds are hashed with SHA-512, so they do not depend on PYTHONHASHSEED
+  return random.Random(":".join(str(key) for key in (seed,) + keys))
+
+def createSeed() -> int:
+  """
+  Creates a random seed for a run that was not given one.
+
+  @return: The seed
+  """
+
+  return random.SystemRandom().randrange(2 ** 32)
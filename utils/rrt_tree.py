@@ -0,0 +1,112 @@
+import numpy as np
+
+class RRTTree:
+  """
+  Array-backed tree of an RRT planner, with compact per-node storage.
+
+  Nodes are numbered in insertion order. Their coordinates and the number of
+  their parent (-1 for a root) are kept in preallocated int32 arrays, which
+  double in size when full, so a node takes 12 bytes instead of the tuples,
+  NumPy scalars and dictionary entries of a parent dictionary. The number of
+  the node at each cell of the map is kept in a flat int32 array, so checking
+  if a point is already in the tree is a lookup. Paths are backtracked by
+  following the parent numbers from a node to its root.
+  """
+
+  def __init__(self, width: int, height: int, capacity: int = 1024) -> None:
+    """
+    Creates an empty tree.
+
+    @param width: The width of the map
+    @param height: The height of the map
+    @param capacity: The number of nodes to allocate space for; the arrays grow past it as needed (default is 1024)
+    """
+
+    capacity = max(int(capacity), 1)
+    self.width = width
+    self.height = height
+    self.count = 0
+    self.xs = np.empty(capacity, dtype=np.int32)
+    self.ys = np.empty(capacity, dtype=np.int32)
+    self.parents = np.empty(capacity, dtype=np.int32)
+    # The number of the node at each cell plus one, 0 for no node
+    self.cell_nodes = np.zeros(width * height, dtype=np.int32)
+
+  def __len__(self) -> int:
+    return self.count
+
+  def insert(self, point: tuple, parent: int = -1) -> int:
+    """
+    Adds a node to the tree.
+
+    @param point: The (x, y) point of the node; it must not already be in the tree
+    @param parent: The number of the parent node (default is -1, a root)
+    @return: The number of the new node
+    """
+
+    node = self.count
+
+    if node == len(self.xs):
+      self._grow(2 * node)
+
+    x, y = int(point[0]), int(point[1])
+    self.xs[node] = x
+    self.ys[node] = y
+    self.parents[node] = parent
+    self.cell_nodes[y * self.width + x] = node + 1
+    self.count += 1
+
+    return node
+
+  def find(self, point: tuple) -> int:
+    """
+    Finds the node at a point.
+
+    @param point: The (x, y) point
+    @return: The number of the node at the point, or -1 if it is not in the tree
+    """
+
+    return int(self.cell_nodes[int(point[1]) * self.width + int(point[0])]) - 1
+
+  def point(self, node: int) -> tuple:
+    """
+    Gets the point of a node.
+
+    @param node: The number of the node
+    @return: The (x, y) point of the node
+    """
+
+    return (int(self.xs[node]), int(self.ys[node]))
+
+  def path(self, node: int) -> list:
+    """
+    Backtracks from a node to its root.
+
+    @param node: The number of the node
+    @return: The (x, y) points from the root to the node
+    """
+
+    xs, ys, parents = self.xs, self.ys, self.parents
+    nodes = []
+
+    while node >= 0:
+      nodes.append(node)
+      node = int(parents[node])
+
+    nodes.reverse()
+
+    return list(zip(xs[nodes].tolist(), ys[nodes].tolist()))
+
+  def _grow(self, capacity: int) -> None:
+    """
+    Reallocates the node arrays with a larger capacity.
+
+    @param capacity: The new number of nodes to allocate space for
+    """
+
+    count = self.count
+
+    for name in ("xs", "ys", "parents"):
+      array = np.empty(capacity, dtype=np.int32)
+      array[:count] = getattr(self, name)[:count]
+      setattr(self, name, array)
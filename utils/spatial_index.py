@@ -0,0 +1,185 @@
+import array
+import math
+
+class BucketGrid:
+  """
+  Uniform bucket grid over the map for nearest-neighbor queries on a growing
+  set of points (e.g. the nodes of an RRT tree).
+
+  Points are inserted incrementally into square buckets. A nearest query
+  searches rings of buckets outward from the query point, restricted to the
+  buckets that hold points, and stops as soon as no closer point can exist.
+  Each bucket keeps the coordinates and integer values of its points in one
+  flat int32 array, so a point takes 12 bytes.
+
+  Any object with the same insert() and nearest() methods can be used in its
+  place by the planners.
+  """
+
+  def __init__(self, width: int, height: int, bucket_size: int) -> None:
+    """
+    Creates an empty bucket grid.
+
+    @param width: The width of the map
+    @param height: The height of the map
+    @param bucket_size: The length and width of a bucket, in pixels
+    """
+
+    self.width = width
+    self.height = height
+    self.bucket_size = max(int(bucket_size), 1)
+    self.buckets = {}
+    self.count = 0
+    # Bounds of the occupied buckets, used to skip empty rings
+    self.min_bucket_x = math.inf
+    self.min_bucket_y = math.inf
+    self.max_bucket_x = -math.inf
+    self.max_bucket_y = -math.inf
+
+  def __len__(self) -> int:
+    return self.count
+
+  def insert(self, point: tuple, value: int) -> None:
+    """
+    Inserts a point into the grid.
+
+    @param point: The (x, y) point to insert
+    @param value: The integer value to return for the point (e.g. a node number)
+    """
+
+    x, y = int(point[0]), int(point[1])
+    bucket_x = x // self.bucket_size
+    bucket_y = y // self.bucket_size
+    key = (bucket_x, bucket_y)
+    bucket = self.buckets.get(key)
+
+    if bucket is None:
+      bucket = array.array("i")
+      self.buckets[key] = bucket
+
+    bucket.extend((x, y, value))
+    self.count += 1
+    self.min_bucket_x = min(self.min_bucket_x, bucket_x)
+    self.min_bucket_y = min(self.min_bucket_y, bucket_y)
+    self.max_bucket_x = max(self.max_bucket_x, bucket_x)
+    self.max_bucket_y = max(self.max_bucket_y, bucket_y)
+
+  def nearest(self, point: tuple):
+    """
+    Finds the inserted point closest to the provided point.
+
+    @param point: The (x, y) query point
+    @return: The value of the nearest point, or None if the grid is empty
+    """
+
+    if self.count == 0:
+      return None
+
+    x, y = point[0], point[1]
+    bucket_size = self.bucket_size
+    query_x = int(x) // bucket_size
+    query_y = int(y) // bucket_size
+    min_x, max_x = self.min_bucket_x, self.max_bucket_x
+    min_y, max_y = self.min_bucket_y, self.max_bucket_y
+    buckets = self.buckets
+    best_value = None
+    best_distance = math.inf
+    # Start at the first ring that reaches the occupied buckets, and stop after
+    # the last ring that still overlaps them
+    ring = max(min_x - query_x, query_x - max_x, min_y - query_y, query_y - max_y, 0)
+    last_ring = max(query_x - min_x, max_x - query_x, query_y - min_y, max_y - query_y)
+
+    while ring <= last_ring:
+
+      for key in self._ringBuckets(query_x, query_y, ring):
+        bucket = buckets.get(key)
+
+        if bucket is None:
+          continue
+
+        entries = iter(bucket)
+
+        for node_x, node_y, value in zip(entries, entries, entries):
+          distance = (node_x - x) ** 2 + (node_y - y) ** 2
+
+          if distance < best_distance:
+            best_distance = distance
+            best_value = value
+
+      # Points in later rings are at least ring * bucket_size away
+      if best_value is not None and best_distance <= (ring * bucket_size) ** 2:
+        break
+
+      ring += 1
+
+    return best_value
+
+  def withinRadius(self, point: tuple, radius: float) -> list:
+    """
+    Finds the inserted points strictly closer than radius to the provided point.
+
+    @param point: The (x, y) query point
+    @param radius: The search radius, in pixels
+    @return: The values of the points within the radius
+    """
+
+    x, y = point[0], point[1]
+    bucket_size = self.bucket_size
+    radius_squared = radius ** 2
+    buckets = self.buckets
+    values = []
+
+    for bucket_y in range(
+      int(math.floor((y - radius) / bucket_size)),
+      int(math.floor((y + radius) / bucket_size)) + 1
+    ):
+
+      for bucket_x in range(
+        int(math.floor((x - radius) / bucket_size)),
+        int(math.floor((x + radius) / bucket_size)) + 1
+      ):
+        bucket = buckets.get((bucket_x, bucket_y))
+
+        if bucket is None:
+          continue
+
+        entries = iter(bucket)
+
+        for node_x, node_y, value in zip(entries, entries, entries):
+
+          if (node_x - x) ** 2 + (node_y - y) ** 2 < radius_squared:
+            values.append(value)
+
+    return values
+
+  def _ringBuckets(self, query_x: int, query_y: int, ring: int) -> list:
+    """
+    Lists the occupied-range buckets at a Chebyshev distance of ring from the
+    query bucket.
+
+    @param query_x: The bucket x-coordinate of the query
+    @param query_y: The bucket y-coordinate of the query
+    @param ring: The ring distance
+    @return: The (bucket_x, bucket_y) keys on the ring
+    """
+
+    if ring == 0:
+      return [(query_x, query_y)]
+
+    min_x = max(query_x - ring, self.min_bucket_x)
+    max_x = min(query_x + ring, self.max_bucket_x)
+    min_y = max(query_y - ring + 1, self.min_bucket_y)
+    max_y = min(query_y + ring - 1, self.max_bucket_y)
+    keys = []
+
+    for bucket_y in (query_y - ring, query_y + ring):
+
+      if self.min_bucket_y <= bucket_y <= self.max_bucket_y:
+        keys.extend((bucket_x, bucket_y) for bucket_x in range(min_x, max_x + 1))
+
+    for bucket_x in (query_x - ring, query_x + ring):
+
+      if self.min_bucket_x <= bucket_x <= self.max_bucket_x:
+        keys.extend((bucket_x, bucket_y) for bucket_y in range(min_y, max_y + 1))
+
+    return keys